@@ -0,0 +1,276 @@
+import numpy as np
+
+from ASSB_parameters import PARAMETERS, battery_family, get_parameter_values
+
+## vectorized version of BatteryModel.calculate_pouch_cell
+## every input is a float64 array of one row per parameter set, the formulas follow the scalar path operation by operation
+## so the results are identical to calculate_pouch_cell
+
+LIB_POUCH_CELL_KEYS = (
+    'Cathode', 'Cathode active material', 'Cathode conductive additive', 'Cathode Binder',
+    'Anode', 'Anode active material', 'Anode conductive additive', 'Anode Binder',
+    'Cathode current collector', 'Anode current collector', 'Electrolyte', 'Separator',
+    'Casing', 'Casing_al_layer', 'Casing_al_pet', 'Casing_al_pp',
+    'Total_mass', 'Cell_capacity', 'Specific_energy', 'Energy_density',
+)
+
+ASSB_POUCH_CELL_KEYS = (
+    'Cathode', 'Cathode active material', 'Cathode conductive additive', 'Cathode Binder',
+    'Anode active material', 'Cathode current collector', 'Electrolyte',
+    'Casing', 'Casing_al_layer', 'Casing_al_pet', 'Casing_al_pp',
+    'Total_mass', 'Cell_capacity', 'Specific_energy', 'Energy_density', 'cell_volume',
+)
+
+POUCH_CELL_KEYS = {'LIB': LIB_POUCH_CELL_KEYS, 'ASSB': ASSB_POUCH_CELL_KEYS}
+
+## union of both branches, in the order of the scalar results
+BATCH_POUCH_CELL_KEYS = LIB_POUCH_CELL_KEYS + tuple(key for key in ASSB_POUCH_CELL_KEYS if key not in LIB_POUCH_CELL_KEYS)
+
+
+def _component_areas(p):
+    return {
+        'cathode_area': p['cathode_width'] * p['cathode_length'] / 100,  # cm^2
+        'anode_area': p['anode_width'] * p['anode_length'] / 100,  # cm^2
+        'electrolyte_area': p['electrolyte_width'] * p['electrolyte_length'] / 100,  # cm^2
+        'current_collector_area': p['current_collector_width'] * p['current_collector_length'] / 100  # cm^2
+    }
+
+
+def _coating_single_layer(p, area, mass_loading, density_binder):
+    # cathode (and LIB anode) coating of one layer, same as calculate_cathode_thickness_single_layer
+    mass_active = mass_loading * area / 1000  # g
+    mass = mass_active / p['ratio_cathode_active_material']
+    mass_bc = mass * p['ratio_cathode_bc']
+    mass_binder = mass * p['ratio_cathode_pvdf']
+
+    volume_active = mass_active / p['density_cam']   # cm^3
+    volume_bc = mass_bc / p['density_black_carbon']
+    volume_binder = mass_binder / density_binder
+
+    material_volume = volume_active + volume_bc + volume_binder
+    processed_volume = material_volume / (1 - p['porosity_cathode'])
+
+    thickness = processed_volume * 10 / area     # mm
+    density = mass / processed_volume            # g/cm3
+    void_volume = processed_volume - material_volume
+    return thickness, density, void_volume
+
+
+def evaluate_pouch_cell(p, family):
+    # p: dict of flat parameter name -> array, all rows of the same battery family
+    # returns the pouch cell results plus the intermediate geometry
+    areas = _component_areas(p)
+    cathode_thickness, cathode_density, cathode_void_volume = _coating_single_layer(
+        p, areas['cathode_area'], p['mass_loading_cathode'], p['density_PVDF'])
+    if family == 'LIB':
+        anode_thickness, anode_density, anode_void_volume = _coating_single_layer(
+            p, areas['anode_area'], p['mass_loading_anode'], p['density_CMC_SBR'])
+    else:
+        anode_thickness = p['anode_thickness']
+        anode_density = p['density_lithium']
+
+    # number of layers
+    available_height = p['cell_height_benchmark'] - 2 * p['cell_container_thickness']
+    if family == 'ASSB':    ##bipolar
+        total_unit_thickness = (
+            anode_thickness +
+            p['aluminum_foil_thickness'] +
+            cathode_thickness +
+            p['electrolyte_thickness'])
+    else:
+        total_unit_thickness = (
+            anode_thickness*2 +
+            p['aluminum_foil_thickness'] +
+            cathode_thickness*2 +
+            p['copper_foil_thickness'] +
+            p['separator_thickness']*2)
+    number_of_layers = np.trunc(available_height / total_unit_thickness)
+    cell_height = total_unit_thickness * number_of_layers   # mm
+
+    # surface area and volume of the pouch cell
+    width = p['total_cell_width'] / 10
+    length = p['total_cell_length'] / 10
+    cell_height_cm = cell_height / 10
+    total_surface_area = 2 * (width * length + width * cell_height_cm + length * cell_height_cm)  ## cm2
+    length = (p['electrolyte_length'] + 2 * p['cell_container_thickness']) / 10
+    width = (p['electrolyte_width'] + 2 * p['cell_container_thickness']) / 10
+    cell_volume = width * length * cell_height_cm       ## cm3
+
+    mass_cathode_current_collector_total = areas['current_collector_area'] * p['aluminum_foil_thickness'] * p['density_aluminum'] / 10 * number_of_layers
+    mass_container_total = total_surface_area * p['cell_container_thickness'] * p['density_cell_container'] / 10
+    mass_container_aluminium = total_surface_area * p['Al_layer_thickness'] * p['density_aluminum'] / 10
+    mass_container_pet = total_surface_area * p['PET_layer_thickness'] * p['density_PET'] / 10
+    mass_container_pp = mass_container_total - mass_container_aluminium - mass_container_pet
+
+    results = {}
+    if family == 'LIB':
+        mass_cathode_total = areas['cathode_area'] * cathode_thickness * 2 * cathode_density/10 * number_of_layers
+        mass_anode_total = areas['anode_area'] * anode_thickness * anode_density*2 / 10 * number_of_layers
+
+        separator_volume_total = 2* areas['current_collector_area'] * p['separator_thickness']/10 * number_of_layers
+        separator_void_volume_total = separator_volume_total * p['porosity_separator']
+        LIB_cathode_void_volume_total = 2 * cathode_void_volume * number_of_layers
+        LIB_anode_void_volume_total = 2 * anode_void_volume * number_of_layers
+        LIB_cell_void_volume_total = separator_void_volume_total + LIB_cathode_void_volume_total + LIB_anode_void_volume_total
+
+        mass_anode_current_collector_total = areas['current_collector_area'] * p['copper_foil_thickness'] * p['density_copper'] / 10 * number_of_layers
+        mass_liquid_electrolyte_total = LIB_cell_void_volume_total * p['density_electrolyte']
+        mass_separator_total = separator_volume_total * p['density_PP']
+        total_cell_mass = mass_anode_total + mass_anode_current_collector_total + mass_cathode_current_collector_total + mass_cathode_total + mass_liquid_electrolyte_total + mass_separator_total + mass_container_total
+        results.update({
+            'Anode': mass_anode_total,
+            'Anode active material': mass_anode_total * p['ratio_cathode_active_material'],
+            'Anode conductive additive': mass_anode_total * p['ratio_cathode_bc'],
+            'Anode Binder': mass_anode_total * p['ratio_cathode_pvdf'],
+            'Anode current collector': mass_anode_current_collector_total,
+            'Electrolyte': mass_liquid_electrolyte_total,
+            'Separator': mass_separator_total,
+        })
+    else:
+        mass_cathode_total = areas['cathode_area'] * cathode_thickness * cathode_density/10 * number_of_layers
+        mass_anode_total = areas['anode_area'] * anode_thickness * anode_density / 10 * number_of_layers
+        mass_solid_electrolyte_total = areas['electrolyte_area'] * p['electrolyte_thickness'] * p['density_electrolyte'] / 10 * number_of_layers
+        total_cell_mass = mass_anode_total + mass_cathode_current_collector_total + mass_cathode_total + mass_solid_electrolyte_total + mass_container_total
+        results.update({
+            'Anode active material': mass_anode_total,
+            'Electrolyte': mass_solid_electrolyte_total,
+            'cell_volume': cell_volume,
+        })
+
+    mass_cam_total = mass_cathode_total * p['ratio_cathode_active_material']
+    cell_capacity = mass_cam_total * p['capacity_material'] * p['voltage'] *0.001    # Wh
+    results.update({
+        'Cathode': mass_cathode_total,
+        'Cathode active material': mass_cam_total,
+        'Cathode conductive additive': mass_cathode_total * p['ratio_cathode_bc'],
+        'Cathode Binder': mass_cathode_total * p['ratio_cathode_pvdf'],
+        'Cathode current collector': mass_cathode_current_collector_total,
+        'Casing': mass_container_total,
+        'Casing_al_layer': mass_container_aluminium,
+        'Casing_al_pet': mass_container_pet,
+        'Casing_al_pp': mass_container_pp,
+        'Total_mass': total_cell_mass,
+        'Cell_capacity': cell_capacity,
+        'Specific_energy': cell_capacity / (total_cell_mass*0.001),   ## Wh/kg
+        'Energy_density': cell_capacity / (cell_volume * 0.001),      ## Wh/L
+        # intermediate geometry
+        'cathode_thickness': cathode_thickness,
+        'anode_thickness': anode_thickness,
+        'available_height': available_height,
+        'total_unit_thickness': total_unit_thickness,
+        'number_of_layers': number_of_layers,
+        'cell_height': cell_height,
+        'total_surface_area': total_surface_area,
+        'total_cell_volume': cell_volume,
+    })
+    return results
+
+
+def _as_column_table(columns):
+    # accept a dict of arrays or a parameter table (e.g. a pandas DataFrame)
+    if columns is None:
+        return {}
+    table = {}
+    for name in columns:
+        if name not in PARAMETERS:
+            raise KeyError(f"Unknown parameter '{name}'.")
+        table[name] = np.asarray(columns[name], dtype=float)
+    return table
+
+
+def batch_inputs(para, battery_type, columns=None):
+    # broadcast battery types and parameter columns to rows
+    # returns the battery type of each row and {battery_type: (row index, inputs)}
+    table = _as_column_table(columns)
+    types = np.asarray(battery_type)
+    size = np.broadcast_shapes((1,), types.shape, *(column.shape for column in table.values()))
+    if len(size) > 1:
+        raise ValueError("Batch parameters must be scalars or one-dimensional columns.")
+    types = np.broadcast_to(types, size).astype(str)
+    groups = {}
+    for bt in dict.fromkeys(types.tolist()):
+        index = np.flatnonzero(types == bt)
+        inputs = {}
+        for name, value in get_parameter_values(para, bt).items():
+            if name in table:
+                column = np.broadcast_to(table[name], size)
+                inputs[name] = column[index]
+            else:
+                inputs[name] = np.broadcast_to(np.float64(value), index.shape)
+        groups[bt] = (index, inputs)
+    return types, groups
+
+
+def calculate_pouch_cell_batch(para, battery_type, columns=None):
+    types, groups = batch_inputs(para, battery_type, columns)
+    results = {key: np.full(types.shape, np.nan) for key in BATCH_POUCH_CELL_KEYS}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for bt, (index, inputs) in groups.items():
+            family = battery_family(bt)
+            values = evaluate_pouch_cell(inputs, family)
+            for key in POUCH_CELL_KEYS[family]:
+                results[key][index] = values[key]
+    return results
+
+
+## components of calculate_percentage_composition (the pouch cell keys without '_')
+PERCENTAGE_KEYS = tuple(key for key in BATCH_POUCH_CELL_KEYS if '_' not in key)
+
+
+def percentage_composition_batch(results):
+    # vectorized BatteryModel.calculate_percentage_composition from calculate_pouch_cell_batch results
+    return {key: (results[key] / results['Total_mass']) * 100 for key in PERCENTAGE_KEYS}
+
+
+## manufacturing_energy result prefix of each process in ASSB_parameters.MANUFACTURING_PROCESSES
+MANUFACTURING_LABELS = {
+    'electrode_manufacturing_anode': 'Anode',
+    'electrolyte_manufacturing': 'Electrolyte',
+    'electrode_manufacturing_cathode': 'Cathode',
+    'assembly': 'Assembly',
+    'formation_and_aging': 'Formation_Aging',
+    'miscellaneous': 'Miscellaneous',
+}
+
+MANUFACTURING_KEYS = tuple(
+    f'{label}_{kind}' for label in MANUFACTURING_LABELS.values() for kind in ('electricity', 'gas', 'total')
+) + ('one_cell_man_energy',)
+
+
+def evaluate_manufacturing_energy(p, cell_capacity):
+    # p: dict of flat parameter name -> array, cell_capacity in Wh, same formulas as BatteryModel.manufacturing_energy
+    cell_capacity = cell_capacity/1000   ## Wh transfered to kWh
+    results = {}
+    one_cell_man_energy = 0
+    for process, label in MANUFACTURING_LABELS.items():
+        electricity = p[process + '_electricity']*cell_capacity
+        gas = p[process + '_gas']*cell_capacity
+        total = electricity + gas
+        results[label + '_electricity'] = electricity
+        results[label + '_gas'] = gas
+        results[label + '_total'] = total
+        one_cell_man_energy = one_cell_man_energy + total
+    results['one_cell_man_energy'] = one_cell_man_energy
+    return results
+
+
+def manufacturing_energy_batch(para, battery_type, columns=None, cell_capacity=None):
+    # vectorized BatteryModel.manufacturing_energy, cell_capacity (Wh) can be passed from calculate_pouch_cell_batch
+    types, groups = batch_inputs(para, battery_type, columns)
+    if cell_capacity is None:
+        cell_capacity = calculate_pouch_cell_batch(para, battery_type, columns)['Cell_capacity']
+    cell_capacity = np.broadcast_to(np.asarray(cell_capacity, dtype=float), types.shape)
+    results = {key: np.full(types.shape, np.nan) for key in MANUFACTURING_KEYS}
+    for bt, (index, inputs) in groups.items():
+        values = evaluate_manufacturing_energy(inputs, cell_capacity[index])
+        for key in MANUFACTURING_KEYS:
+            results[key][index] = values[key]
+    return results
+
+
+def evaluate_outputs(para, battery_type, columns, outputs):
+    # batch evaluation of the requested pouch cell and manufacturing energy keys
+    results = calculate_pouch_cell_batch(para, battery_type, columns)
+    if any(key in MANUFACTURING_KEYS for key in outputs):
+        results.update(manufacturing_energy_batch(para, battery_type, columns, cell_capacity=results['Cell_capacity']))
+    return {key: results[key] for key in outputs}
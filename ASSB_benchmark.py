@@ -0,0 +1,221 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import ASSB_scenarios
+from ASSB_batch_model import calculate_pouch_cell_batch, manufacturing_energy_batch
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_sweep import BATTERY_TYPES, SweepRunner
+
+## Benchmarks of the dimensioning model with JSON baselines
+##   python ASSB_benchmark.py --save baseline.json                   # measure and store a baseline
+##   python ASSB_benchmark.py --compare baseline.json --tolerance 0.2
+## compare mode exits with 1 when a benchmark is more than tolerance slower than the baseline, or when a numerical
+## output differs from the baseline by more than rtol (the numbers are recorded next to the timings)
+##
+## scalar calls are timed with an empty cache (the cache is cleared before each call), so they measure
+## the calculation and not the cache lookup
+
+SCENARIOS = {
+    'baseline': 'ASSB_baseline_performance_parameters.yml',
+    'optimal': 'ASSB_optimal_performance_parameters.yml',
+    'highest': 'ASSB_highest_performance_parameters.yml',
+}
+
+BATCH_SIZES = (1, 1000, 100000)
+
+
+def _scenario_path(scenario):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), SCENARIOS[scenario])
+
+
+def measure(function, evaluations=1, min_time=0.1, repeat=5, setup=None):
+    # time function() like timeit: the number of calls per measurement is grown until it takes min_time
+    # returns the median and minimum seconds per call and the evaluations per second
+    def timed(number):
+        total = 0.0
+        for _ in range(number):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            function()
+            total += time.perf_counter() - start
+        return total
+
+    number = 1
+    while True:
+        elapsed = timed(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, math.ceil(min_time / elapsed)))
+    times = [elapsed / number] + [timed(number) / number for _ in range(repeat - 1)]
+    median = statistics.median(times)
+    return {
+        'seconds_per_call': median,
+        'min_seconds_per_call': min(times),
+        'evaluations_per_call': evaluations,
+        'throughput': evaluations / median if median > 0 else math.inf,
+        'calls': number * repeat,
+    }
+
+
+def _float_tree(tree):
+    return {key: float(value) for key, value in tree.items()}
+
+
+def run_benchmarks(batch_sizes=BATCH_SIZES, min_time=0.1, repeat=5, sweep=True, max_workers=None, progress=None):
+    # returns {'environment', 'benchmarks': {name: timings}, 'outputs': {name: {key: value}}}
+    benchmarks, outputs = {}, {}
+
+    def record(name, function, **options):
+        benchmarks[name] = measure(function, min_time=min_time, repeat=repeat, **options)
+        if progress is not None:
+            progress(name, benchmarks[name])
+
+    models = {scenario: BatteryModel(_scenario_path(scenario)) for scenario in SCENARIOS}
+    for scenario, model in models.items():
+        path = _scenario_path(scenario)
+        record(f'BatteryModel[{scenario}]', lambda: BatteryModel(path))
+        cache_dir = ASSB_scenarios.CACHE_DIR
+        ASSB_scenarios.CACHE_DIR = None
+        try:
+            record(f'BatteryModel_uncached[{scenario}]', lambda: BatteryModel(path), setup=ASSB_scenarios.clear_cache)
+        finally:
+            ASSB_scenarios.CACHE_DIR = cache_dir
+            ASSB_scenarios.clear_cache()
+
+        for bt in BATTERY_TYPES:
+            case = f'{scenario}/{bt}'
+            record(f'calculate_pouch_cell[{case}]', lambda: model.calculate_pouch_cell(bt), setup=model._cache.clear)
+            record(f'calculate_percentage_composition[{case}]', lambda: model.calculate_percentage_composition(bt),
+                   setup=model._cache.clear)
+            record(f'manufacturing_energy[{case}]', lambda: model.manufacturing_energy(bt), setup=model._cache.clear)
+            model._cache.clear()
+            outputs[f'calculate_pouch_cell[{case}]'] = _float_tree(model.calculate_pouch_cell(bt))
+            outputs[f'calculate_percentage_composition[{case}]'] = _float_tree(model.calculate_percentage_composition(bt))
+            outputs[f'manufacturing_energy[{case}]'] = _float_tree(model.manufacturing_energy(bt))
+
+            # alternate between two values so every update changes the model
+            porosity = model.parameters(bt).porosity_cathode
+            values = itertools.cycle([porosity * 1.01, porosity])
+
+            def update_and_evaluate():
+                model.update_parameters({'material_properties': {'porosity_cathode': next(values)}})
+                model.calculate_pouch_cell(bt)
+                model.manufacturing_energy(bt)
+            record(f'update_parameters+evaluate[{case}]', update_and_evaluate)
+            model.update_parameters({'material_properties': {'porosity_cathode': porosity}})
+
+    model = models['baseline']
+    for size in batch_sizes:
+        types = np.resize(np.array(BATTERY_TYPES), size)
+        columns = {'mass_loading_cathode': np.linspace(8, 30, size), 'porosity_cathode': np.linspace(0.35, 0.15, size)}
+
+        def evaluate_batch():
+            results = calculate_pouch_cell_batch(model.para, types, columns)
+            results.update(manufacturing_energy_batch(model.para, types, columns, cell_capacity=results['Cell_capacity']))
+            return results
+        record(f'batch[{size}]', evaluate_batch, evaluations=size)
+        results = evaluate_batch()
+        outputs[f'batch[{size}]'] = {f'{key}_sum': float(np.nansum(results[key]))
+                                     for key in ('Total_mass', 'Specific_energy', 'Energy_density', 'one_cell_man_energy')}
+
+    if sweep:
+        # cartesian grid of the three scenarios x four battery types x mass loadings, about size rows in total,
+        # the benchmark is named by the actual number of rows (at least one mass loading per scenario and type)
+        for size in batch_sizes:
+            points = max(1, size // (len(SCENARIOS) * len(BATTERY_TYPES)))
+            runner = SweepRunner([_scenario_path(scenario) for scenario in SCENARIOS], BATTERY_TYPES,
+                                 {'mass_loading_cathode': np.linspace(8, 30, points).tolist()},
+                                 chunk_size=max(1000, -(-len(SCENARIOS) * len(BATTERY_TYPES) * points // 8)),
+                                 max_workers=max_workers)
+            name = f'sweep[{len(runner)}]'
+            if name in benchmarks:
+                continue    # several small sizes give the same grid
+            record(name, runner.run, evaluations=len(runner))
+            results = runner.run()
+            outputs[name] = {'rows': len(runner), 'Specific_energy_sum': float(np.nansum(results['Specific_energy']))}
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'benchmarks': benchmarks,
+        'outputs': outputs,
+    }
+
+
+def compare(baseline, current, tolerance=0.2, rtol=1e-9):
+    # regressions: benchmarks whose best time grew by more than tolerance (0.2 = 20 %), the minimum is compared
+    # because it is the least disturbed by other load on the machine
+    # drift: outputs that differ by more than rtol, or are missing from a benchmark that ran
+    regressions, improvements, drift = {}, {}, {}
+    for name, timing in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        ratio = timing['min_seconds_per_call'] / baseline['benchmarks'][name]['min_seconds_per_call']
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+        elif ratio < 1 / (1 + tolerance):
+            improvements[name] = ratio
+    for name, values in baseline['outputs'].items():
+        if name not in current['outputs']:
+            continue    # not part of this run
+        for key, expected in values.items():
+            actual = current['outputs'][name].get(key)
+            if actual is None or not (math.isclose(actual, expected, rel_tol=rtol) or
+                                      (math.isnan(actual) and math.isnan(expected))):
+                drift[f'{name}.{key}'] = (expected, actual)
+    return {'regressions': regressions, 'improvements': improvements, 'drift': drift,
+            'passed': not regressions and not drift}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the ASSB dimensioning model")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare with this JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown, 0.2 = 20 %%")
+    parser.add_argument('--rtol', type=float, default=1e-9, help="allowed relative change of the outputs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BATCH_SIZES), help="batch and sweep sizes")
+    parser.add_argument('--min-time', type=float, default=0.1, help="seconds per measurement")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-sweep', action='store_true', help="skip the process pool sweeps")
+    parser.add_argument('--max-workers', type=int)
+    args = parser.parse_args(argv)
+
+    def progress(name, timing):
+        print(f"{name:60s} {timing['seconds_per_call'] * 1e6:12.1f} us/call {timing['throughput']:14.0f} evaluations/s")
+
+    results = run_benchmarks(args.sizes, args.min_time, args.repeat, not args.no_sweep, args.max_workers, progress)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        report = compare(baseline, results, args.tolerance, args.rtol)
+        for name, ratio in report['regressions'].items():
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline time")
+        for name, ratio in report['improvements'].items():
+            print(f"improved   {name}: {ratio:.2f}x the baseline time")
+        for name, (expected, actual) in report['drift'].items():
+            print(f"DRIFT      {name}: {expected!r} -> {actual!r}")
+        print("passed" if report['passed'] else "failed")
+        return 0 if report['passed'] else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+
+from ASSB_batch_model import MANUFACTURING_KEYS, POUCH_CELL_KEYS, evaluate_manufacturing_energy, evaluate_pouch_cell
+from ASSB_parameters import battery_family, parameter_names
+
+## Specialized evaluators of calculate_pouch_cell and manufacturing_energy for one battery type
+## the batch kernel is run once on symbolic free parameters: operations on constants are folded (in the same order
+## as the interpreted path, so the folded values are identical), every other operation becomes one line of a
+## generated straight-line Python function, identical operations are computed once and unused ones are dropped
+##
+##   evaluate = model.compile('ASSB_NMC811', ['mass_loading_cathode', 'porosity_cathode'])
+##   evaluate(20.0, 0.25)['Specific_energy']
+##   print(evaluate.source)
+
+
+class _Symbol:
+    # a value of the generated function, records the operations applied to it
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def _binary(self, operator, a, b):
+        return self.trace.operation(operator, a, b)
+
+    def __add__(self, other):
+        return self._binary('+', self, other)
+
+    def __radd__(self, other):
+        return self._binary('+', other, self)
+
+    def __sub__(self, other):
+        return self._binary('-', self, other)
+
+    def __rsub__(self, other):
+        return self._binary('-', other, self)
+
+    def __mul__(self, other):
+        return self._binary('*', self, other)
+
+    def __rmul__(self, other):
+        return self._binary('*', other, self)
+
+    def __truediv__(self, other):
+        return self._binary('/', self, other)
+
+    def __rtruediv__(self, other):
+        return self._binary('/', other, self)
+
+    def __neg__(self):
+        return self.trace.negate(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # np.trunc of the layer count, numpy arrays do not occur in the traced kernel
+        if ufunc is np.trunc and method == '__call__':
+            return self.trace.truncate(inputs[0])
+        return NotImplemented
+
+
+class _Trace:
+    def __init__(self):
+        self.lines = {}     # expression -> variable name, in the order of creation
+        self.uses = {}      # variable name -> names it is computed from
+
+    def _variable(self, expression, operands):
+        if expression not in self.lines:
+            name = f'v{len(self.lines)}'
+            self.lines[expression] = name
+            self.uses[name] = [operand.name for operand in operands if isinstance(operand, _Symbol)]
+        return _Symbol(self, self.lines[expression])
+
+    @staticmethod
+    def _code(value):
+        if isinstance(value, _Symbol):
+            return value.name
+        return repr(_constant(value))
+
+    def operation(self, operator, a, b):
+        return self._variable(f'{self._code(a)} {operator} {self._code(b)}', (a, b))
+
+    def negate(self, a):
+        return self._variable(f'-{a.name}', (a,))
+
+    def truncate(self, a):
+        return self._variable(f'trunc({a.name})', (a,))
+
+
+def _constant(value):
+    # numpy scalars from folding (np.trunc of a constant) as Python numbers
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def compile_evaluator(para, battery_type, free_parameters, outputs=None, vectorized=False):
+    # para: parameter record or dict of the flat parameter values of battery_type (e.g. BatteryModel.parameters(bt))
+    # free_parameters: flat parameter names, the arguments of the generated function in this order
+    # outputs: result keys (default: all calculate_pouch_cell and manufacturing_energy keys of the battery type)
+    # vectorized: the arguments may be numpy arrays (np.trunc instead of math.trunc)
+    # returns evaluate(*free parameter values) -> {output: value}, the generated code is evaluate.source
+    family = battery_family(battery_type)
+    names = parameter_names(battery_type)
+    values = para.as_dict() if hasattr(para, 'as_dict') else dict(para)
+    free_parameters = list(free_parameters)
+    for name in free_parameters:
+        if name not in names:
+            raise KeyError(f"Unknown parameter '{name}' for battery type '{battery_type}'.")
+    available = POUCH_CELL_KEYS[family] + MANUFACTURING_KEYS
+    outputs = list(available if outputs is None else outputs)
+    for key in outputs:
+        if key not in available:
+            raise KeyError(f"Unknown output '{key}' for battery type '{battery_type}'.")
+
+    trace = _Trace()
+    p = {name: values[name] for name in names}
+    for name in free_parameters:
+        p[name] = _Symbol(trace, name)
+    results = evaluate_pouch_cell(p, family)
+    results.update(evaluate_manufacturing_energy(p, results['Cell_capacity']))
+
+    # keep the lines the outputs depend on
+    needed = set()
+    pending = [results[key].name for key in outputs if isinstance(results[key], _Symbol)]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(trace.uses.get(name, ()))
+    body = [f'    {name} = {expression}' for expression, name in trace.lines.items() if name in needed]
+    returned = ', '.join(f'{key!r}: {_Trace._code(results[key])}' for key in outputs)
+    source = '\n'.join([f"def evaluate({', '.join(free_parameters)}):"] + body + [f'    return {{{returned}}}']) + '\n'
+
+    namespace = {'trunc': np.trunc if vectorized else math.trunc, 'inf': math.inf, 'nan': math.nan}
+    exec(compile(source, f'<compiled {battery_type}>', 'exec'), namespace)
+    evaluate = namespace['evaluate']
+    evaluate.source = source
+    return evaluate
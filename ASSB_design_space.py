@@ -0,0 +1,199 @@
+import numpy as np
+
+from ASSB_batch_model import batch_inputs, evaluate_manufacturing_energy, evaluate_pouch_cell
+from ASSB_parameters import battery_family, parameter_names
+
+## Design space exploration of the pouch cell geometry
+## geometries are enumerated (grid) or sampled chunk by chunk, infeasible ones are dropped before the evaluation,
+## only the non-dominated (Pareto optimal) designs are kept
+##
+## space: {flat parameter name: (low, high) sampled uniformly, or [values] as a discrete axis}
+## derive: optional function columns -> extra columns, e.g. to keep the anode 1 mm larger than the cathode:
+##   lambda c: {'anode_width': c['cathode_width'] + 2, 'anode_length': c['cathode_length'] + 2}
+
+DEFAULT_OBJECTIVES = {
+    'Specific_energy': 'max',
+    'Energy_density': 'max',
+    'one_cell_man_energy': 'min',
+    'Total_mass': 'min',
+}
+
+
+def _covered_by(front, points):
+    # points dominated by or equal to a point of the front (maximization of all columns)
+    # points that are already covered are not compared with the remaining front blocks
+    covered = np.zeros(len(points), dtype=bool)
+    remaining = np.arange(len(points))
+    for start in range(0, len(front), 64):
+        if len(remaining) == 0:
+            break
+        block = front[start:start + 64]
+        candidates = points[remaining]
+        geq = block[:, None, 0] >= candidates[None, :, 0]
+        for j in range(1, points.shape[1]):
+            geq &= block[:, None, j] >= candidates[None, :, j]
+        hit = geq.any(axis=0)
+        covered[remaining[hit]] = True
+        remaining = remaining[~hit]
+    return covered
+
+
+def non_dominated(objectives, block_size=1024):
+    # indices of the non-dominated rows of objectives (n, d), all columns maximized, duplicates kept once
+    # points are sorted lexicographically (best first) so a point can only be dominated by an earlier one:
+    # for two objectives one sweep over the running maximum, O(n log n); for more the sweep compares each
+    # block against the front found so far
+    if len(objectives) == 0:
+        return np.empty(0, dtype=int)
+    order = np.lexsort(-objectives.T[::-1])
+    points = objectives[order]
+    if points.shape[1] == 1:
+        return order[:1]
+    if points.shape[1] == 2:
+        best = np.maximum.accumulate(np.concatenate([[-np.inf], points[:-1, 1]]))
+        return order[points[:, 1] > best]
+
+    kept = []
+    front = np.empty((0, points.shape[1]))
+    for start in range(0, len(points), block_size):
+        block = points[start:start + block_size]
+        index = np.arange(start, start + len(block))
+        survivors = ~_covered_by(front, block)
+        block, index = block[survivors], index[survivors]
+        # inside the block only an earlier point can dominate (or duplicate) a later one
+        geq = np.all(block[:, None, :] >= block[None, :, :], axis=2)
+        dominated = np.triu(geq, k=1).any(axis=0)
+        block, index = block[~dominated], index[~dominated]
+        front = np.concatenate([front, block])
+        kept.append(index)
+    return order[np.concatenate(kept)]
+
+
+class ParetoArchive:
+    # non-dominated designs found so far, objectives are stored as maximization values
+    def __init__(self, objectives):
+        self.objectives = dict(objectives)
+        self.sign = np.array([1.0 if direction == 'max' else -1.0 for direction in self.objectives.values()])
+        self.points = np.empty((0, len(self.objectives)))
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def add(self, results, columns):
+        # results: {objective key: array}, columns: {design variable: array} of the same rows
+        points = np.stack([results[key] for key in self.objectives], axis=1) * self.sign
+        new = ~_covered_by(self.points, points)    # cheap pre-filter against the archive
+        merged = np.concatenate([self.points, points[new]])
+        merged_columns = {name: np.concatenate([self.columns.get(name, np.empty(0)), values[new]])
+                          for name, values in columns.items()}
+        keep = non_dominated(merged)
+        self.points = merged[keep]
+        self.columns = {name: values[keep] for name, values in merged_columns.items()}
+
+    def front(self):
+        front = {name: values.copy() for name, values in self.columns.items()}
+        for j, key in enumerate(self.objectives):
+            front[key] = self.points[:, j] * self.sign[j]
+        return front
+
+
+class DesignSpaceExplorer:
+    # model: BatteryModel, the parameters outside the space keep the model values
+    def __init__(self, model, battery_type, space, objectives=None, derive=None, chunk_size=100000, seed=0):
+        self.names = parameter_names(battery_type)
+        for name in space:
+            if name not in self.names:
+                raise KeyError(f"Unknown parameter '{name}' for battery type '{battery_type}'.")
+        self.model = model
+        self.battery_type = battery_type
+        self.family = battery_family(battery_type)
+        self.space = {name: list(values) if isinstance(values, list) else tuple(values) for name, values in space.items()}
+        self.objectives = dict(objectives or DEFAULT_OBJECTIVES)
+        self.derive = derive
+        self.chunk_size = chunk_size
+        self.rng = np.random.default_rng(seed)
+        self.archive = ParetoArchive(self.objectives)
+        self.evaluated = 0
+        self.infeasible_geometry = 0
+        self.infeasible_layers = 0
+
+    def _sample(self, size):
+        columns = {}
+        for name, values in self.space.items():
+            if isinstance(values, list):
+                columns[name] = self.rng.choice(np.asarray(values, dtype=float), size)
+            else:
+                columns[name] = self.rng.uniform(values[0], values[1], size)
+        return columns
+
+    def _grid(self, start, stop):
+        axes = [np.asarray(values, dtype=float) for values in self.space.values()]
+        index = np.unravel_index(np.arange(start, stop), [len(axis) for axis in axes])
+        return {name: axis[i] for name, axis, i in zip(self.space, axes, index)}
+
+    @staticmethod
+    def _feasible(p, family):
+        # geometric checks that do not need the model: nested footprints, room for the stack, valid fractions
+        feasible = (
+            (p['anode_width'] >= p['cathode_width']) & (p['anode_length'] >= p['cathode_length']) &
+            (p['electrolyte_width'] >= p['anode_width']) & (p['electrolyte_length'] >= p['anode_length']) &
+            (p['current_collector_width'] >= p['cathode_width']) & (p['current_collector_length'] >= p['cathode_length']) &
+            (p['total_cell_width'] >= p['electrolyte_width'] + 2 * p['cell_container_thickness']) &
+            (p['total_cell_length'] >= p['electrolyte_length'] + 2 * p['cell_container_thickness']) &
+            (p['cell_height_benchmark'] > 2 * p['cell_container_thickness']) &
+            (p['porosity_cathode'] >= 0) & (p['porosity_cathode'] < 1) &
+            (p['mass_loading_cathode'] > 0) & (p['aluminum_foil_thickness'] >= 0))
+        if family == 'ASSB':
+            feasible &= (p['anode_thickness'] > 0) & (p['electrolyte_thickness'] > 0)
+        else:
+            feasible &= (p['mass_loading_anode'] > 0) & (p['separator_thickness'] > 0)
+        return feasible
+
+    def _evaluate_chunk(self, columns):
+        if self.derive is not None:
+            derived = self.derive(columns)
+            for name in derived:
+                if name not in self.names:
+                    raise KeyError(f"Unknown derived parameter '{name}' for battery type '{self.battery_type}'.")
+            columns.update(derived)
+        types, groups = batch_inputs(self.model.para, self.battery_type, columns)
+        (index, inputs), = groups.values()
+        feasible = np.flatnonzero(self._feasible(inputs, self.family))
+        self.infeasible_geometry += len(index) - len(feasible)
+        inputs = {name: values[feasible] for name, values in inputs.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results = evaluate_pouch_cell(inputs, self.family)
+            results.update(evaluate_manufacturing_energy(inputs, results['Cell_capacity']))
+        self.evaluated += len(feasible)
+        layers = results['number_of_layers'] >= 1
+        self.infeasible_layers += int(len(feasible) - layers.sum())
+        design = {name: values[feasible][layers] for name, values in columns.items()}
+        design['number_of_layers'] = results['number_of_layers'][layers]
+        self.archive.add({key: results[key][layers] for key in self.objectives}, design)
+
+    def explore(self, n_samples=None):
+        # sample n_samples designs, or enumerate the full grid when every axis of the space is a list of values
+        # can be called repeatedly, the Pareto front accumulates; returns the current front
+        if n_samples is None:
+            if not all(isinstance(values, list) for values in self.space.values()):
+                raise ValueError("Give n_samples or only discrete axes (lists of values) for a grid.")
+            size = int(np.prod([len(values) for values in self.space.values()]))
+            for start in range(0, size, self.chunk_size):
+                self._evaluate_chunk(self._grid(start, min(start + self.chunk_size, size)))
+        else:
+            for start in range(0, n_samples, self.chunk_size):
+                self._evaluate_chunk(self._sample(min(self.chunk_size, n_samples - start)))
+        return self.front()
+
+    def front(self):
+        # design variables and objective values of the non-dominated designs
+        return self.archive.front()
+
+    def stats(self):
+        return {
+            'evaluated': self.evaluated,
+            'infeasible_geometry': self.infeasible_geometry,
+            'infeasible_layers': self.infeasible_layers,
+            'front_size': len(self.archive),
+        }
@@ -1,45 +1,125 @@
-import yaml
 import math
+import functools
+import inspect
 
+from ASSB_batch_model import calculate_pouch_cell_batch, manufacturing_energy_batch
+from ASSB_codegen import compile_evaluator
+from ASSB_inverse_design import inverse_design
+from ASSB_parameters import PARAMETERS, MANUFACTURING_PROCESSES, compile_parameters, update_records
+from ASSB_scenarios import load_compiled, load_scenario, recursive_update
+
+
+## flat parameters (see ASSB_parameters) each cached intermediate result depends on
+AREA_DEPENDENCIES = (
+    'cathode_width', 'cathode_length', 'anode_width', 'anode_length',
+    'electrolyte_width', 'electrolyte_length', 'current_collector_width', 'current_collector_length')
+COATING_DEPENDENCIES = AREA_DEPENDENCIES + (
+    'ratio_cathode_active_material', 'ratio_cathode_bc', 'ratio_cathode_pvdf', 'porosity_cathode',
+    'density_cam', 'density_black_carbon', 'density_PVDF', 'density_CMC_SBR',
+    'mass_loading_cathode', 'mass_loading_anode')
+LAYER_DEPENDENCIES = COATING_DEPENDENCIES + (
+    'cell_height_benchmark', 'cell_container_thickness', 'anode_thickness', 'aluminum_foil_thickness',
+    'copper_foil_thickness', 'separator_thickness', 'electrolyte_thickness', 'density_lithium')
+CELL_DEPENDENCIES = LAYER_DEPENDENCIES + ('total_cell_width', 'total_cell_length')
+POUCH_CELL_DEPENDENCIES = tuple(name for name in PARAMETERS if not name.startswith(MANUFACTURING_PROCESSES))
+
+
+def cached(*dependencies):
+    # Memoize a calculation per (method, arguments), the first argument is normally the battery type
+    # the entry is dropped when update_parameters touches one of its dependencies
+    def decorator(method):
+        signature = inspect.signature(method)
+        positional = len(signature.parameters) - 1
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if kwargs or len(args) != positional:
+                # keyword calls use the same cache entry as positional ones
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                args = bound.args[1:]
+            key = (method.__name__,) + args
+            if key in self._cache:
+                self.cache_hits += 1
+                value = self._cache[key][0]
+            else:
+                self.cache_misses += 1
+                value = method(self, *args)
+                battery_type = args[0] if args and isinstance(args[0], str) else None
+                paths = []
+                for name in dependencies:
+                    path, indexed, families = PARAMETERS[name]
+                    if indexed and battery_type is not None:
+                        path = path + (battery_type,)
+                    paths.append(path)
+                self._cache[key] = (value, paths)
+            if isinstance(value, dict):
+                return dict(value)   # callers may modify the returned dict
+            return value
+        wrapper.cached = True   # lets the profiler tell cache hits apart
+        return wrapper
+    return decorator
 
 
 class BatteryModel:
     def __init__(self, para_path):
-        # Load parameters from YAML file
-        self.para = self.load_parameter(para_path)
+        # Load parameters from YAML file, validated flat parameters (shared ones and per battery type) for the calculations
+        self.para, self.common, self.records = load_compiled(para_path)
         self.dimensions = self.para['dimensions']
         self.material_properties = self.para['material_properties']
         self.densities = self.para['densities']
         self.thicknesses = self.para['thicknesses']
         self.battery_type = self.para.get('battery_type', {})
         self.battery_manufacturing_energy = self.para['battery_manufacturing_energy']
+        # cache of intermediate results, see cached()
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         
     @staticmethod
     def load_parameter(path):
-        # Load and return parameters (dict)
-        with open(path, 'r') as file:
-            data = yaml.safe_load(file)
-        # validate the 'battery_type' section here if necessary
-        if 'battery_type' not in data:
-            raise ValueError("Battery type is missing.")
-        return data
+        # Load and return parameters (dict), scenario overlays are merged into their parent, see ASSB_scenarios
+        return load_scenario(path)
         
     def update_parameters(self, updates):
-            # Recursively update parameters to handle nested dictionary updates
-        def recursive_update(orig_dict, new_updates):
+        # validate before changing anything, a bad update leaves the model as it was
+        self.common, self.records = update_records(self.common, self.records, self.para, updates)
+        self.para = recursive_update(self.para, updates)
+        self.invalidate_cache(updates)
+
+    def parameters(self, battery_type):
+        # validated parameter record of one battery type
+        if battery_type not in self.records:
+            raise KeyError(f"Unknown battery type '{battery_type}'.")
+        return self.records[battery_type]
+
+    def invalidate_cache(self, updates=None):
+        # Drop the cached results depending on the updated parameters, all of them if updates is None
+        # without updates the parameter dicts may have been modified directly, the records are compiled again
+        if updates is None:
+            self.common, self.records = compile_parameters(self.para)
+            self._cache.clear()
+            return
+
+        def touched_paths(new_updates, prefix=()):
             for key, value in new_updates.items():
-                if isinstance(value, dict):
-                    orig_dict[key] = recursive_update(orig_dict.get(key, {}), value)
+                if isinstance(value, dict) and value:
+                    yield from touched_paths(value, prefix + (key,))
                 else:
-                    orig_dict[key] = value
-            return orig_dict
+                    yield prefix + (key,)
 
-        self.para = recursive_update(self.para, updates)
+        touched = list(touched_paths(updates))
+        for key, (value, paths) in list(self._cache.items()):
+            if any(t[:len(p)] == p or p[:len(t)] == t for t in touched for p in paths):
+                del self._cache[key]
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'size': len(self._cache)}
         
     def get_anode_thickness(self, battery_type):
         # retrieve the anode thickness from 
         if 'ASSB' in battery_type:
-            anode_thickness = self.thicknesses['anode'][battery_type]
+            anode_thickness = self.parameters(battery_type).anode_thickness
         elif 'LIB' in battery_type:
             anode_thickness = self.calculate_LIBanode_thickness_single_layer(battery_type)['anode_thickness']   
         return anode_thickness
@@ -47,11 +127,12 @@ class BatteryModel:
     def get_anode_density(self, battery_type):
     # Try to retrieve the cathode thickness from the parameters
         if 'ASSB' in battery_type:
-            anode_density = self.densities['lithium']
+            anode_density = self.parameters(battery_type).density_lithium
         elif 'LIB' in battery_type:
             anode_density = self.calculate_LIBanode_thickness_single_layer(battery_type)['anode_density']
         return anode_density
     
+    @cached(*COATING_DEPENDENCIES)
     def calculate_LIBanode_thickness_single_layer(self, battery_type):
         # Calculation for anode thickness based on material properties and dimensions
         if 'LIB' not in battery_type:
@@ -62,20 +143,21 @@ class BatteryModel:
         else:
             pass  
        
+        para = self.parameters(battery_type)
         anode_area = self.calculate_component_areas()['anode_area']  # cm^2      ## single side area
-        mass_loading = self.material_properties['mass_loading']['anode'][battery_type]   # mg/cm2   ## single side mass loading
+        mass_loading = para.mass_loading_anode   # mg/cm2   ## single side mass loading
 
         mass_anode_active = mass_loading * anode_area / 1000  # Convert mg to g    ## single side mass
-        mass_anode = mass_anode_active / self.material_properties['ratio_cathode_active_material']     ## g    ## single side mass
-        mass_anode_bc = mass_anode * self.material_properties['ratio_cathode_bc']        ## g  conductive_additive, black carbon    ## single side mass
-        mass_anode_CMC_SBR = mass_anode * self.material_properties['ratio_cathode_pvdf']    ## g    ## single side mass
+        mass_anode = mass_anode_active / para.ratio_cathode_active_material     ## g    ## single side mass
+        mass_anode_bc = mass_anode * para.ratio_cathode_bc        ## g  conductive_additive, black carbon    ## single side mass
+        mass_anode_CMC_SBR = mass_anode * para.ratio_cathode_pvdf    ## g    ## single side mass
 
-        volume_anode_active = mass_anode_active / self.densities['cam'][battery_type]    # cm^3    ## single side volume
-        volume_anode_bc = mass_anode_bc / self.densities['black_carbon']   # cm^3     ## single side volume
-        volume_anode_CMC_SBR = mass_anode_CMC_SBR / self.densities['CMC-SBR']   # cm^3         ## single side volume
+        volume_anode_active = mass_anode_active / para.density_cam    # cm^3    ## single side volume
+        volume_anode_bc = mass_anode_bc / para.density_black_carbon   # cm^3     ## single side volume
+        volume_anode_CMC_SBR = mass_anode_CMC_SBR / para.density_CMC_SBR   # cm^3         ## single side volume
 
         anode_material_volume = volume_anode_active + volume_anode_bc + volume_anode_CMC_SBR      # cm^3     ## single side volume
-        processed_anode_volume = anode_material_volume / (1 - self.material_properties['porosity_cathode'])      # cm^3      ## single side volume
+        processed_anode_volume = anode_material_volume / (1 - para.porosity_cathode)      # cm^3      ## single side volume
         
         LIB_anode_thickness = processed_anode_volume * 10 / anode_area     # thickness in mm      ## single side thickness
         LIB_anode_density = mass_anode / processed_anode_volume               # g/cm3    
@@ -87,22 +169,24 @@ class BatteryModel:
                 }  
       
         
+    @cached(*COATING_DEPENDENCIES)
     def calculate_cathode_thickness_single_layer(self, battery_type):
         # Calculation for cathode thickness based on material properties and dimensions
+        para = self.parameters(battery_type)
         cathode_area = self.calculate_component_areas()['cathode_area']  # cm^2   #the area per single layer
-        mass_loading = self.material_properties['mass_loading']['cathode'][battery_type]   # mg/cm2
+        mass_loading = para.mass_loading_cathode   # mg/cm2
 
         mass_cathode_active = mass_loading * cathode_area / 1000  # Convert mg to g  #the amount per single layer
-        mass_cathode = mass_cathode_active / self.material_properties['ratio_cathode_active_material']     ## g
-        mass_cathode_bc = mass_cathode * self.material_properties['ratio_cathode_bc']        ## g  conductive_additive, black carbon
-        mass_cathode_pvdf = mass_cathode * self.material_properties['ratio_cathode_pvdf']    ## g
+        mass_cathode = mass_cathode_active / para.ratio_cathode_active_material     ## g
+        mass_cathode_bc = mass_cathode * para.ratio_cathode_bc        ## g  conductive_additive, black carbon
+        mass_cathode_pvdf = mass_cathode * para.ratio_cathode_pvdf    ## g
 
-        volume_cathode_active = mass_cathode_active / self.densities['cam'][battery_type]    # cm^3
-        volume_cathode_bc = mass_cathode_bc / self.densities['black_carbon']   # cm^3  
-        volume_cathode_pvdf = mass_cathode_pvdf / self.densities['PVDF']   # cm^3      
+        volume_cathode_active = mass_cathode_active / para.density_cam    # cm^3
+        volume_cathode_bc = mass_cathode_bc / para.density_black_carbon   # cm^3  
+        volume_cathode_pvdf = mass_cathode_pvdf / para.density_PVDF   # cm^3      
 
         cathode_material_volume = volume_cathode_active + volume_cathode_bc + volume_cathode_pvdf      # cm^3
-        processed_cathode_volume = cathode_material_volume / (1 - self.material_properties['porosity_cathode'])      # cm^3
+        processed_cathode_volume = cathode_material_volume / (1 - para.porosity_cathode)      # cm^3
         
         cathode_thickness = processed_cathode_volume * 10 / cathode_area     # thickness in mm, one side coated for LIB
         cathode_density = mass_cathode/processed_cathode_volume               # g/cm3
@@ -114,6 +198,7 @@ class BatteryModel:
                 }    
         
         
+    @cached(*CELL_DEPENDENCIES)
     def calculate_all(self, battery_type):
         
         number_of_layers, cell_height = self.calculate_number_of_layers(battery_type)
@@ -136,52 +221,58 @@ class BatteryModel:
         return intermediate_results    
     
     
+    @cached(*LAYER_DEPENDENCIES)
     def calculate_number_of_layers(self, battery_type):
         # Calculate the number of layers based on the cell dimensions and material thicknesses
-        available_height = self.dimensions['cell_height_benchmark'] - 2 * self.thicknesses['cell_container_thickness']
+        para = self.parameters(battery_type)
+        available_height = para.cell_height_benchmark - 2 * para.cell_container_thickness
         cathode_thickness = self.calculate_cathode_thickness_single_layer(battery_type)['cathode_thickness']
         anode_thickness = self.get_anode_thickness(battery_type)
         if 'ASSB' in battery_type:    ##bipolar
             total_unit_thickness = (
             anode_thickness + 
-            self.thicknesses['aluminum_foil'] +
+            para.aluminum_foil_thickness +
             cathode_thickness +
-            self.thicknesses['electrolyte'][battery_type])
+            para.electrolyte_thickness)
         elif 'LIB' in battery_type:
             total_unit_thickness = (
             anode_thickness*2 +
-            self.thicknesses['aluminum_foil'] +
+            para.aluminum_foil_thickness +
             cathode_thickness*2 +
-            self.thicknesses['copper_foil'] +
-            self.thicknesses['separator'][battery_type]*2)
+            para.copper_foil_thickness +
+            para.separator_thickness*2)
 
 
         number_of_layers = int(available_height / total_unit_thickness)
         cell_height = total_unit_thickness * number_of_layers  # Update cell height based on calculated layers, mm
         return number_of_layers, cell_height     
     
+    @cached(*CELL_DEPENDENCIES)
     def calculate_total_surface_area(self, cell_height):
         # Calculate the total surface area of the pouch cell needed for the casing material
-        width = self.dimensions['total_cell']['width'] / 10  # Convert mm to cm
-        length = self.dimensions['total_cell']['length'] / 10  # Convert mm to cm
+        width = self.common.total_cell_width / 10  # Convert mm to cm
+        length = self.common.total_cell_length / 10  # Convert mm to cm
         cell_height_cm = cell_height / 10  # Convert mm to cm
         # Calculate total surface area considering all sides of the pouch cell
         cell_surface_area = 2 * (width * length + width * cell_height_cm + length * cell_height_cm)  ## cm2
         return cell_surface_area
     
+    @cached(*CELL_DEPENDENCIES)
     def calculate_total_volume(self, cell_height):
         # Calculate the total volume of the pouch cell needed for the casing material
-        electrolyte_length = self.dimensions['electrolyte']['length']   # mm
-        electrolyte_width = self.dimensions['electrolyte']['width']  # mm
-        length = (electrolyte_length + 2 * self.thicknesses['cell_container_thickness']) / 10   # Convert mm to cm, estimated real length
-        width = (electrolyte_width + 2 * self.thicknesses['cell_container_thickness']) / 10      # Convert mm to cm, estimated real length 
+        electrolyte_length = self.common.electrolyte_length   # mm
+        electrolyte_width = self.common.electrolyte_width  # mm
+        length = (electrolyte_length + 2 * self.common.cell_container_thickness) / 10   # Convert mm to cm, estimated real length
+        width = (electrolyte_width + 2 * self.common.cell_container_thickness) / 10      # Convert mm to cm, estimated real length 
         cell_height_cm = cell_height / 10  # Convert mm to cm
         # Calculate total surface area considering all sides of the pouch cell
         cell_volume = width * length * cell_height_cm       ## cm3
         return cell_volume    
     
+    @cached(*POUCH_CELL_DEPENDENCIES)
     def calculate_pouch_cell(self, battery_type):
         # Calculate the material requirements for each component in the pouch cell
+        para = self.parameters(battery_type)
         all_calculations = self.calculate_all(battery_type)
         number_of_layers = all_calculations['number_of_layers'] 
         total_surface_area = all_calculations['total_surface_area']
@@ -191,15 +282,15 @@ class BatteryModel:
         anode_density = self.get_anode_density(battery_type)
         areas = self.calculate_component_areas()       ##
         cell_height = self.calculate_all(battery_type)['cell_height']
-        cathode_material_capacity = self.material_properties['capacity_material'][battery_type]
-        voltage = self.material_properties['voltage'][battery_type]
+        cathode_material_capacity = para.capacity_material
+        voltage = para.voltage
         
         # Calculate the mass of each component
 
-        mass_cathode_current_collector_total = areas['current_collector_area'] * self.thicknesses['aluminum_foil'] * self.densities['aluminum'] / 10 * number_of_layers  # g
-        mass_container_total = total_surface_area * self.thicknesses['cell_container_thickness'] * self.densities['cell_container_density'] / 10    # g
-        mass_container_aluminium = total_surface_area * self.thicknesses['Al_layer'] * self.densities['aluminum'] / 10    # g
-        mass_container_pet = total_surface_area * self.thicknesses['PET_layer'] * self.densities['PET'] / 10    # g
+        mass_cathode_current_collector_total = areas['current_collector_area'] * para.aluminum_foil_thickness * para.density_aluminum / 10 * number_of_layers  # g
+        mass_container_total = total_surface_area * para.cell_container_thickness * para.density_cell_container / 10    # g
+        mass_container_aluminium = total_surface_area * para.Al_layer_thickness * para.density_aluminum / 10    # g
+        mass_container_pet = total_surface_area * para.PET_layer_thickness * para.density_PET / 10    # g
         mass_container_pp = mass_container_total - mass_container_aluminium - mass_container_pet      # g
 
         
@@ -215,8 +306,8 @@ class BatteryModel:
             
             # Calculate the pouch cell void volume for electrolyte 
             separator_area = areas['current_collector_area']  ## assumed that separator has the same area as cc, single layer
-            separator_thickness = self.thicknesses['separator'][battery_type]
-            separator_porosity = self.material_properties['porosity_separator']
+            separator_thickness = para.separator_thickness
+            separator_porosity = para.porosity_separator
             separator_volume_total = 2* separator_area * separator_thickness/10 * number_of_layers   ## 2 separators in one repeating unit
             separator_void_volume_total = separator_volume_total * separator_porosity
             ### LIB cathode void volume
@@ -224,26 +315,26 @@ class BatteryModel:
             LIB_anode_void_volume_total = 2 * self.calculate_all(battery_type)['LIB_anode_void_volume'] * number_of_layers
             LIB_cell_void_volume_total = separator_void_volume_total + LIB_cathode_void_volume_total + LIB_anode_void_volume_total                
             ### LIB cathode void volume       
-            mass_aam_total = mass_anode_total * self.material_properties['ratio_cathode_active_material']   # g
-            mass_anode_bc_total = mass_anode_total * self.material_properties['ratio_cathode_bc']             # g  conductive_additive, black carbon
-            mass_anode_binder_total = mass_anode_total * self.material_properties['ratio_cathode_pvdf']    # g
-            mass_anode_current_collector_total = areas['current_collector_area'] * self.thicknesses['copper_foil'] * self.densities['copper'] / 10 * number_of_layers  # g
-            mass_liquid_electrolyte_total = LIB_cell_void_volume_total * self.densities['electrolyte'][battery_type]    ## g
-            mass_separator_total =  separator_volume_total * self.densities['PP']
+            mass_aam_total = mass_anode_total * para.ratio_cathode_active_material   # g
+            mass_anode_bc_total = mass_anode_total * para.ratio_cathode_bc             # g  conductive_additive, black carbon
+            mass_anode_binder_total = mass_anode_total * para.ratio_cathode_pvdf    # g
+            mass_anode_current_collector_total = areas['current_collector_area'] * para.copper_foil_thickness * para.density_copper / 10 * number_of_layers  # g
+            mass_liquid_electrolyte_total = LIB_cell_void_volume_total * para.density_electrolyte    ## g
+            mass_separator_total =  separator_volume_total * para.density_PP
             total_cell_mass = mass_anode_total + mass_anode_current_collector_total + mass_cathode_current_collector_total + mass_cathode_total + mass_liquid_electrolyte_total + mass_separator_total + mass_container_total    # g
         elif 'ASSB' in battery_type:
             # Calculate the mass of each component
             mass_cathode_total = areas['cathode_area'] * cathode_thickness * cathode_density/10 * number_of_layers
             mass_anode_total = areas['anode_area'] * anode_thickness * anode_density / 10 * number_of_layers  # g   thickness (mm)
-            mass_solid_electrolyte_total = areas['electrolyte_area'] * self.thicknesses['electrolyte'][battery_type] * self.densities['electrolyte'][battery_type] / 10 * number_of_layers  # g
+            mass_solid_electrolyte_total = areas['electrolyte_area'] * para.electrolyte_thickness * para.density_electrolyte / 10 * number_of_layers  # g
             total_cell_mass = mass_anode_total + mass_cathode_current_collector_total + mass_cathode_total + mass_solid_electrolyte_total + mass_container_total    # g        
             
 
 
         ## calculate the cathode materials
-        mass_cam_total = mass_cathode_total * self.material_properties['ratio_cathode_active_material']   # g
-        mass_cathode_bc_total = mass_cathode_total * self.material_properties['ratio_cathode_bc']              # g conductive_additive, black carbon
-        mass_cathode_binder_total = mass_cathode_total * self.material_properties['ratio_cathode_pvdf']    # g
+        mass_cam_total = mass_cathode_total * para.ratio_cathode_active_material   # g
+        mass_cathode_bc_total = mass_cathode_total * para.ratio_cathode_bc              # g conductive_additive, black carbon
+        mass_cathode_binder_total = mass_cathode_total * para.ratio_cathode_pvdf    # g
 
         # Calculate battery capacity and specific energy based on the cathode material
 
@@ -297,19 +388,41 @@ class BatteryModel:
         
         
 
+    def calculate_pouch_cell_batch(self, battery_type, columns=None):
+        # Vectorized calculate_pouch_cell over many parameter sets
+        # battery_type: one battery type or an array with one battery type per row
+        # columns: dict (or table, e.g. pandas DataFrame) of flat parameter name -> array, see ASSB_parameters.PARAMETERS
+        # parameters without a column keep the value of this model, returns dict of output key -> array
+        return calculate_pouch_cell_batch(self.para, battery_type, columns)
+
+    def manufacturing_energy_batch(self, battery_type, columns=None):
+        # Vectorized manufacturing_energy, same arguments as calculate_pouch_cell_batch
+        return manufacturing_energy_batch(self.para, battery_type, columns)
+
+    def inverse_design(self, battery_type, targets, free_parameters, **options):
+        # Solve for the free parameters that give the target outputs, e.g.
+        # inverse_design('ASSB_NMC811', {'Specific_energy': 400}, {'mass_loading_cathode': (5, 40)})
+        # see ASSB_inverse_design.inverse_design for the options and the returned dict
+        return inverse_design(self, battery_type, targets, free_parameters, **options)
+
+    def compile(self, battery_type, free_parameters, outputs=None, vectorized=False):
+        # specialized evaluate(*free parameter values) of calculate_pouch_cell and manufacturing_energy,
+        # the other parameters are the current values (see ASSB_codegen)
+        return compile_evaluator(self.parameters(battery_type), battery_type, free_parameters, outputs, vectorized)
+
+    def get_parameter_values(self, battery_type):
+        # flat parameter name -> value of all inputs used for this battery type
+        return self.parameters(battery_type).as_dict()
              
+    @cached(*AREA_DEPENDENCIES)
     def calculate_component_areas(self):
-        cathode = self.dimensions['cathode']
-        anode = self.dimensions['anode']
-        electrolyte = self.dimensions['electrolyte']
-        current_collector = self.dimensions['current_collector']
-        
+        para = self.common
 
         return {
-            'cathode_area': cathode['width'] * cathode['length'] / 100,  # cm^2
-            'anode_area': anode['width'] * anode['length'] / 100,  # cm^2
-            'electrolyte_area': electrolyte['width'] * electrolyte['length'] / 100,  # cm^2
-            'current_collector_area': current_collector['width'] * current_collector['length'] / 100  # cm^ 
+            'cathode_area': para.cathode_width * para.cathode_length / 100,  # cm^2
+            'anode_area': para.anode_width * para.anode_length / 100,  # cm^2
+            'electrolyte_area': para.electrolyte_width * para.electrolyte_length / 100,  # cm^2
+            'current_collector_area': para.current_collector_width * para.current_collector_length / 100  # cm^ 
         }
 
     # Function to calculate the percentage composition of each component
@@ -326,35 +439,30 @@ class BatteryModel:
 
 
     def manufacturing_energy(self, battery_type):
-        ## access the relavant section in yaml file 
-        anode_manu = self.battery_manufacturing_energy['electrode_manufacturing_anode']
-        electrolyte_manu = self.battery_manufacturing_energy['electrolyte_manufacturing']
-        cathode_manu = self.battery_manufacturing_energy['electrode_manufacturing_cathode']
-        assembly_manu = self.battery_manufacturing_energy['assembly']
-        formation_aging_manu = self.battery_manufacturing_energy['formation_and_aging']
-        miscellaneous_manu = self.battery_manufacturing_energy['miscellaneous']
+        ## energy consumption of each process, kWhprod/kWhcell
+        para = self.parameters(battery_type)
         ## the cell capacity of each batteries
         cell_capacity = self.calculate_pouch_cell(battery_type)['Cell_capacity']/1000   ## Wh transfered to kWh
         
         ## electricity and gas consumption of each processes for one cell, with unit of kWh
         
-        Electrode_manufacturing_Anode_electrcity = anode_manu['electric_energy_consumption'][battery_type]*cell_capacity
-        Electrode_manufacturing_Anode_gas = anode_manu['gas_consumption'][battery_type] * cell_capacity
+        Electrode_manufacturing_Anode_electrcity = para.electrode_manufacturing_anode_electricity*cell_capacity
+        Electrode_manufacturing_Anode_gas = para.electrode_manufacturing_anode_gas * cell_capacity
         Electrode_manufacturing_Anode_total = Electrode_manufacturing_Anode_electrcity + Electrode_manufacturing_Anode_gas
-        Electrolyte_manufacturing_electricity = electrolyte_manu ['electric_energy_consumption'][battery_type]*cell_capacity
-        Electrolyte_manufacturing_gas = electrolyte_manu['gas_consumption'][battery_type]*cell_capacity
+        Electrolyte_manufacturing_electricity = para.electrolyte_manufacturing_electricity*cell_capacity
+        Electrolyte_manufacturing_gas = para.electrolyte_manufacturing_gas*cell_capacity
         Electrolyte_manufacturing_total = Electrolyte_manufacturing_electricity + Electrolyte_manufacturing_gas
-        Electrode_manufacturing_cathode_electrcity = cathode_manu['electric_energy_consumption'][battery_type]*cell_capacity
-        Electrode_manufacturing_cathode_gas = cathode_manu['gas_consumption'][battery_type]*cell_capacity
+        Electrode_manufacturing_cathode_electrcity = para.electrode_manufacturing_cathode_electricity*cell_capacity
+        Electrode_manufacturing_cathode_gas = para.electrode_manufacturing_cathode_gas*cell_capacity
         Electrode_manufacturing_cathode_total = Electrode_manufacturing_cathode_electrcity + Electrode_manufacturing_cathode_gas
-        Assembly_electricity = assembly_manu['electric_energy_consumption'][battery_type]*cell_capacity
-        Assembly_gas = assembly_manu['gas_consumption'][battery_type]*cell_capacity
+        Assembly_electricity = para.assembly_electricity*cell_capacity
+        Assembly_gas = para.assembly_gas*cell_capacity
         Assembly_total = Assembly_electricity + Assembly_gas
-        Formation_Aging_electricity = formation_aging_manu['electric_energy_consumption'][battery_type]*cell_capacity
-        Formation_Aging_gas = formation_aging_manu['gas_consumption'][battery_type]*cell_capacity
+        Formation_Aging_electricity = para.formation_and_aging_electricity*cell_capacity
+        Formation_Aging_gas = para.formation_and_aging_gas*cell_capacity
         Formation_Aging_total = Formation_Aging_electricity + Formation_Aging_gas
-        Miscellaneous_electricity = miscellaneous_manu['electric_energy_consumption'][battery_type]*cell_capacity
-        Miscellaneous_gas = miscellaneous_manu['gas_consumption'][battery_type]*cell_capacity
+        Miscellaneous_electricity = para.miscellaneous_electricity*cell_capacity
+        Miscellaneous_gas = para.miscellaneous_gas*cell_capacity
         Miscellaneous_total = Miscellaneous_electricity + Miscellaneous_gas
         one_cell_man_energy = Electrode_manufacturing_Anode_total + Electrolyte_manufacturing_total + Electrode_manufacturing_cathode_total + Assembly_total + Formation_Aging_total + Miscellaneous_total
         
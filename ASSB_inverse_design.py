@@ -0,0 +1,151 @@
+import numpy as np
+
+from ASSB_batch_model import (MANUFACTURING_KEYS, POUCH_CELL_KEYS, calculate_pouch_cell_batch, evaluate_outputs,
+                              manufacturing_energy_batch)
+from ASSB_parameters import battery_family, parameter_names, parameter_update
+
+## Inverse design: find values of free parameters (flat names of ASSB_parameters) that hit target outputs,
+## e.g. the cathode mass loading that gives 400 Wh/kg
+## one free parameter and one target: a coarse grid brackets the sign changes, then Illinois false position
+## refines each bracket; the output jumps where the number of layers changes, so a bracket can close on a jump
+## instead of a root, the next bracket is tried then
+## otherwise: bounded Nelder-Mead on the squared relative target errors, started from the best of a sampled batch
+
+
+class _Objective:
+    # evaluates the targets for rows of free parameter values and counts the model evaluations
+    def __init__(self, model, battery_type, targets, names):
+        self.para = model.para
+        self.battery_type = battery_type
+        self.targets = targets
+        self.names = names
+        self.evaluations = 0
+
+    def __call__(self, x):
+        x = np.atleast_2d(x)
+        self.evaluations += len(x)
+        columns = {name: x[:, j] for j, name in enumerate(self.names)}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return evaluate_outputs(self.para, self.battery_type, columns, list(self.targets))
+
+
+def _solve_bracketing(objective, target_key, target, low, high, rtol, max_evaluations, grid_points):
+    def residual(x):
+        return objective(np.array([[x]]))[target_key][0] - target
+
+    grid = np.linspace(low, high, grid_points)
+    values = objective(grid[:, None])[target_key] - target
+    best_x, best_f = grid[np.nanargmin(np.abs(values))], np.nanmin(np.abs(values))
+    brackets = [i for i in range(grid_points - 1) if values[i] * values[i + 1] <= 0]
+    for i in brackets:
+        a, b, fa, fb = grid[i], grid[i + 1], values[i], values[i + 1]
+        while objective.evaluations < max_evaluations:
+            if abs(fb) <= rtol * abs(target):
+                return b, True
+            if abs(fa) <= rtol * abs(target):
+                return a, True
+            c = b - fb * (b - a) / (fb - fa)
+            if not min(a, b) < c < max(a, b):
+                c = (a + b) / 2
+            fc = residual(c)
+            if fc * fb < 0:
+                a, fa = b, fb
+            else:
+                fa = fa / 2     # Illinois modification, avoids the stagnation of plain false position
+            b, fb = c, fc
+            for x, f in ((a, fa), (b, fb)):
+                if abs(f) < best_f:
+                    best_x, best_f = x, abs(f)
+            if abs(b - a) <= 1e-12 * (high - low):
+                break   # the bracket closed on a layer jump
+    return best_x, best_f <= rtol * abs(target)
+
+
+def _solve_nelder_mead(objective, targets, low, high, rtol, max_evaluations, seed):
+    # minimize the summed squared relative errors in the unit box [0, 1]^k
+    def error(unit):
+        unit = np.clip(unit, 0, 1)
+        values = objective(low + unit * (high - low))
+        err = sum((values[key] / target - 1) ** 2 for key, target in targets.items())
+        return np.where(np.isfinite(err), err, np.inf)
+
+    k = len(low)
+    start = np.random.default_rng(seed).random((8 * (k + 1), k))
+    start_error = error(start)
+    simplex = [start[np.argmin(start_error)]]
+    for j in range(k):
+        vertex = simplex[0].copy()
+        vertex[j] = vertex[j] + 0.1 if vertex[j] < 0.9 else vertex[j] - 0.1
+        simplex.append(vertex)
+    simplex = np.array(simplex)
+    f = error(simplex)
+    tolerance = rtol ** 2
+
+    while objective.evaluations < max_evaluations and f.min() > tolerance:
+        order = np.argsort(f)
+        simplex, f = simplex[order], f[order]
+        centroid = simplex[:-1].mean(axis=0)
+        reflected = np.clip(2 * centroid - simplex[-1], 0, 1)
+        fr = error(reflected)[0]
+        if fr < f[0]:
+            expanded = np.clip(3 * centroid - 2 * simplex[-1], 0, 1)
+            fe = error(expanded)[0]
+            simplex[-1], f[-1] = (expanded, fe) if fe < fr else (reflected, fr)
+        elif fr < f[-2]:
+            simplex[-1], f[-1] = reflected, fr
+        else:
+            contracted = (centroid + simplex[-1]) / 2
+            fc = error(contracted)[0]
+            if fc < f[-1]:
+                simplex[-1], f[-1] = contracted, fc
+            else:
+                simplex[1:] = (simplex[0] + simplex[1:]) / 2
+                f[1:] = error(simplex[1:])
+        if np.ptp(simplex, axis=0).max() < 1e-12:
+            break
+    best = np.clip(simplex[np.argmin(f)], 0, 1)
+    return low + best * (high - low), f.min() <= tolerance
+
+
+def inverse_design(model, battery_type, targets, free_parameters, rtol=1e-6, max_evaluations=200, grid_points=9,
+                   seed=0, apply=False):
+    # targets: {output key: value}, e.g. {'Specific_energy': 400}
+    # free_parameters: {flat parameter name: (low, high)}, the other parameters keep the model values
+    # returns the parameter values, the achieved outputs, whether all targets are met within rtol,
+    # the number of model evaluations and the resulting calculate_pouch_cell / manufacturing_energy results
+    family = battery_family(battery_type)
+    for key in targets:
+        if key not in POUCH_CELL_KEYS[family] and key not in MANUFACTURING_KEYS:
+            raise KeyError(f"Unknown output '{key}' for battery type '{battery_type}'.")
+    available = parameter_names(battery_type)
+    for name in free_parameters:
+        if name not in available:
+            raise KeyError(f"Unknown parameter '{name}' for battery type '{battery_type}'.")
+
+    names = list(free_parameters)
+    low = np.array([free_parameters[name][0] for name in names], dtype=float)
+    high = np.array([free_parameters[name][1] for name in names], dtype=float)
+    objective = _Objective(model, battery_type, targets, names)
+    if len(names) == 1 and len(targets) == 1:
+        (key, target), = targets.items()
+        x, converged = _solve_bracketing(objective, key, target, low[0], high[0], rtol, max_evaluations, grid_points)
+        solution = np.array([x])
+    else:
+        solution, converged = _solve_nelder_mead(objective, targets, low, high, rtol, max_evaluations, seed)
+
+    parameters = {name: float(value) for name, value in zip(names, solution)}
+    columns = {name: [value] for name, value in parameters.items()}
+    composition = calculate_pouch_cell_batch(model.para, battery_type, columns)
+    manufacturing = manufacturing_energy_batch(model.para, battery_type, columns, cell_capacity=composition['Cell_capacity'])
+    composition = {key: float(composition[key][0]) for key in POUCH_CELL_KEYS[family]}
+    manufacturing = {key: float(manufacturing[key][0]) for key in MANUFACTURING_KEYS}
+    if apply:
+        model.update_parameters(parameter_update(parameters, battery_type))
+    return {
+        'parameters': parameters,
+        'achieved': {key: {**composition, **manufacturing}[key] for key in targets},
+        'converged': bool(converged),
+        'evaluations': objective.evaluations,
+        'composition': composition,
+        'manufacturing_energy': manufacturing,
+    }
@@ -0,0 +1,351 @@
+import math
+import os
+import pickle
+
+import numpy as np
+import yaml
+
+from ASSB_batch_model import (POUCH_CELL_KEYS, MANUFACTURING_KEYS, calculate_pouch_cell_batch,
+                              manufacturing_energy_batch)
+from ASSB_parameters import PARAMETERS, battery_family, get_parameter, parameter_names
+
+## Monte Carlo uncertainty propagation through the dimensioning model
+## samples are evaluated chunk by chunk with the batch model, only streaming statistics are kept per output key
+## so the memory does not grow with the number of samples
+##
+## distribution spec (yaml), parameter names are the flat names of ASSB_parameters.PARAMETERS:
+##   seed: 42
+##   parameters:
+##     mass_loading_cathode: {distribution: normal, std: 1.5}            # mean defaults to the scenario value
+##     porosity_cathode: {distribution: triangular, low: 0.2, high: 0.35}   # mode defaults to the scenario value
+##     electrolyte_thickness:                                            # one spec per battery type
+##       ASSB_LFP: {distribution: lognormal, sigma: 0.1}                 # median defaults to the scenario value
+##       ASSB_NMC811: {distribution: uniform, low: 0.03, high: 0.04}
+##   correlations:
+##     - [mass_loading_cathode, porosity_cathode, 0.5]                   # correlation of the underlying normal draws (gaussian copula)
+## parameters that a battery type does not use (e.g. separator_thickness for the ASSB types) are ignored for it
+
+DISTRIBUTIONS = ('normal', 'triangular', 'uniform', 'lognormal')
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+def load_distributions(path):
+    # Load and return the distribution spec (dict)
+    with open(path, 'r') as file:
+        spec = yaml.safe_load(file)
+    if 'parameters' not in spec:
+        raise ValueError("Distribution spec has no 'parameters' section.")
+    return spec
+
+
+def _normal_cdf(z):
+    return 0.5 * _erfc(-z / math.sqrt(2))
+
+
+class ParameterSampler:
+    # draws parameter columns for one battery type from a distribution spec
+    def __init__(self, para, battery_type, spec):
+        self.battery_type = battery_type
+        self.distributions = {}
+        names = parameter_names(battery_type)
+        for name, dist in spec.get('parameters', {}).items():
+            if name not in PARAMETERS:
+                raise KeyError(f"Unknown parameter '{name}'.")
+            if 'distribution' not in dist:
+                if battery_type not in dist:
+                    continue    # no uncertainty for this battery type
+                if name not in names:
+                    raise ValueError(f"Parameter '{name}' is not used by battery type '{battery_type}'.")
+                dist = dist[battery_type]
+            elif name not in names:
+                continue    # a spec for all battery types, not used by this one
+            self.distributions[name] = self._complete(dist, get_parameter(para, name, battery_type), name)
+
+        self.correlated = []
+        pairs = [pair for pair in spec.get('correlations', []) or []
+                 if pair[0] in self.distributions and pair[1] in self.distributions]
+        for a, b, rho in pairs:
+            for name in (a, b):
+                if name not in self.correlated:
+                    self.correlated.append(name)
+        self.cholesky = None
+        if self.correlated:
+            corr = np.eye(len(self.correlated))
+            for a, b, rho in pairs:
+                i, j = self.correlated.index(a), self.correlated.index(b)
+                corr[i, j] = corr[j, i] = rho
+            try:
+                self.cholesky = np.linalg.cholesky(corr)
+            except np.linalg.LinAlgError:
+                raise ValueError("Correlation matrix is not positive definite.")
+
+    @staticmethod
+    def _complete(dist, nominal, name):
+        kind = dist['distribution']
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{kind}' for parameter '{name}'.")
+        dist = dict(dist)
+        if kind == 'normal':
+            dist.setdefault('mean', nominal)
+        elif kind == 'triangular':
+            dist.setdefault('mode', nominal)
+        elif kind == 'lognormal':
+            dist.setdefault('median', nominal)
+        required = {'normal': ('mean', 'std'), 'triangular': ('low', 'mode', 'high'),
+                    'uniform': ('low', 'high'), 'lognormal': ('median', 'sigma')}[kind]
+        missing = [key for key in required if key not in dist]
+        if missing:
+            raise ValueError(f"Distribution of parameter '{name}' is missing {missing}.")
+        return dist
+
+    @staticmethod
+    def _from_normal(dist, z):
+        # transform standard normal draws, used for the correlated parameters
+        kind = dist['distribution']
+        if kind == 'normal':
+            return dist['mean'] + dist['std'] * z
+        if kind == 'lognormal':
+            return dist['median'] * np.exp(dist['sigma'] * z)
+        u = _normal_cdf(z)
+        low, high = dist['low'], dist['high']
+        if kind == 'uniform':
+            return low + (high - low) * u
+        # inverse cdf of the triangular distribution
+        c = (dist['mode'] - low) / (high - low)
+        return np.where(u < c,
+                        low + np.sqrt(u * (high - low) * (dist['mode'] - low)),
+                        high - np.sqrt((1 - u) * (high - low) * (high - dist['mode'])))
+
+    @staticmethod
+    def _draw(dist, rng, size):
+        kind = dist['distribution']
+        if kind == 'normal':
+            return rng.normal(dist['mean'], dist['std'], size)
+        if kind == 'lognormal':
+            return rng.lognormal(math.log(dist['median']), dist['sigma'], size)
+        if kind == 'uniform':
+            return rng.uniform(dist['low'], dist['high'], size)
+        return rng.triangular(dist['low'], dist['mode'], dist['high'], size)
+
+    def sample(self, rng, size):
+        columns = {}
+        if self.correlated:
+            z = rng.standard_normal((size, len(self.correlated))) @ self.cholesky.T
+            for i, name in enumerate(self.correlated):
+                columns[name] = self._from_normal(self.distributions[name], z[:, i])
+        for name, dist in self.distributions.items():
+            if name not in columns:
+                columns[name] = self._draw(dist, rng, size)
+        return columns
+
+
+class RunningMoments:
+    # count, mean, variance, min and max merged chunk by chunk (Chan et al. parallel update)
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+
+class TDigest:
+    # merging t-digest for streaming quantiles, about compression/2 centroids are kept
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        # merge the sorted values with the (sorted) centroids
+        values = np.sort(values)
+        position = np.searchsorted(values, self.means) + np.arange(len(self.means))
+        means = np.empty(len(values) + len(self.means))
+        weights = np.ones(len(means))
+        is_centroid = np.zeros(len(means), dtype=bool)
+        is_centroid[position] = True
+        means[position] = self.means
+        weights[position] = self.weights
+        means[~is_centroid] = values
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        # scale function k1, every centroid covers at most about one unit of k
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        if len(self.weights) == 0:
+            return math.nan
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - self.weights / 2
+        return float(np.interp(q * cumulative[-1],
+                               np.concatenate([[0], centers, [cumulative[-1]]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+
+class StreamingHistogram:
+    # fixed number of equal bins, the range is doubled (merging neighbouring bins) when values fall outside
+    def __init__(self, bins=64):
+        if bins % 2:
+            raise ValueError("The number of histogram bins must be even.")
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.low = None
+        self.width = None
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        bins = len(self.counts)
+        vmin, vmax = values.min(), values.max()
+        if self.low is None:
+            span = vmax - vmin
+            if span == 0:
+                span = max(abs(vmin), 1.0) * 1e-6
+            self.low = vmin
+            self.width = span / (bins - 1)
+        while vmin < self.low or vmax >= self.low + bins * self.width:
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            empty = np.zeros(bins // 2, dtype=np.int64)
+            if vmin < self.low:
+                self.counts = np.concatenate([empty, merged])
+                self.low = self.low - bins * self.width
+            else:
+                self.counts = np.concatenate([merged, empty])
+            self.width *= 2
+        index = np.clip(((values - self.low) / self.width).astype(np.int64), 0, bins - 1)
+        self.counts += np.bincount(index, minlength=bins)
+
+    @property
+    def edges(self):
+        if self.low is None:
+            return np.empty(0)
+        return self.low + self.width * np.arange(len(self.counts) + 1)
+
+
+class OutputStatistics:
+    # streaming statistics of one output key
+    def __init__(self, compression=200, bins=64):
+        self.moments = RunningMoments()
+        self.digest = TDigest(compression)
+        self.histogram = StreamingHistogram(bins)
+        self.non_finite = 0
+
+    def update(self, values):
+        finite = np.isfinite(values)
+        self.non_finite += int(len(values) - finite.sum())
+        values = values[finite]
+        self.moments.update(values)
+        self.digest.update(values)
+        self.histogram.update(values)
+
+    def summary(self, quantiles):
+        return {
+            'count': self.moments.count,
+            'non_finite': self.non_finite,
+            'mean': self.moments.mean if self.moments.count else math.nan,
+            'std': math.sqrt(self.moments.variance) if self.moments.count > 1 else math.nan,
+            'min': self.moments.min,
+            'max': self.moments.max,
+            'quantiles': {q: self.digest.quantile(q) for q in quantiles},
+            'histogram': (self.histogram.edges, self.histogram.counts.copy()),
+        }
+
+
+class MonteCarlo:
+    # model: BatteryModel of the scenario, spec: distribution spec dict (see load_distributions)
+    # the draws of chunk i only depend on (seed, i), a run resumed from a checkpoint sees the same samples
+    def __init__(self, model, battery_type, spec, seed=None, chunk_size=10000,
+                 quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), compression=200, bins=64):
+        self.model = model
+        self.battery_type = battery_type
+        self.spec = spec
+        self.seed = spec.get('seed', 0) if seed is None else seed
+        self.chunk_size = chunk_size
+        self.quantiles = tuple(quantiles)
+        self.sampler = ParameterSampler(model.para, battery_type, spec)
+        self.keys = POUCH_CELL_KEYS[battery_family(battery_type)] + MANUFACTURING_KEYS
+        self.statistics = {key: OutputStatistics(compression, bins) for key in self.keys}
+        self.samples_done = 0
+
+    def _evaluate_chunk(self, chunk_index, offset, size):
+        rng = np.random.default_rng([self.seed, chunk_index])
+        columns = self.sampler.sample(rng, self.chunk_size)
+        columns = {name: values[offset:offset + size] for name, values in columns.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results = calculate_pouch_cell_batch(self.model.para, self.battery_type, columns)
+            results.update(manufacturing_energy_batch(self.model.para, self.battery_type, columns,
+                                                      cell_capacity=results['Cell_capacity']))
+        for key in self.keys:
+            self.statistics[key].update(results[key])
+
+    def run(self, n_samples, checkpoint=None):
+        # evaluate until n_samples samples in total are done, saving a checkpoint after each chunk if a path is given
+        while self.samples_done < n_samples:
+            chunk_index, offset = divmod(self.samples_done, self.chunk_size)
+            size = min(self.chunk_size - offset, n_samples - self.samples_done)
+            self._evaluate_chunk(chunk_index, offset, size)
+            self.samples_done += size
+            if checkpoint is not None:
+                self.save_checkpoint(checkpoint)
+        return self.summary()
+
+    def summary(self):
+        return {key: self.statistics[key].summary(self.quantiles) for key in self.keys}
+
+    def _state(self):
+        return {
+            'battery_type': self.battery_type,
+            'spec': self.spec,
+            'seed': self.seed,
+            'chunk_size': self.chunk_size,
+            'quantiles': self.quantiles,
+            'nominal': self.model.get_parameter_values(self.battery_type),
+            'samples_done': self.samples_done,
+            'statistics': self.statistics,
+        }
+
+    def save_checkpoint(self, path):
+        # write to a temporary file first so an interrupted save keeps the previous checkpoint
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(self._state(), file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def resume(cls, model, path):
+        # continue a run from a checkpoint, the model must hold the same scenario parameters
+        with open(path, 'rb') as file:
+            state = pickle.load(file)
+        if model.get_parameter_values(state['battery_type']) != state['nominal']:
+            raise ValueError("The model parameters differ from the checkpointed run.")
+        run = cls(model, state['battery_type'], state['spec'], seed=state['seed'],
+                  chunk_size=state['chunk_size'], quantiles=state['quantiles'])
+        run.statistics = state['statistics']
+        run.samples_done = state['samples_done']
+        return run
@@ -0,0 +1,315 @@
+import numbers
+
+## Flat names for the scalar inputs of the dimensioning model.
+## Each entry maps a name to (path in the yaml parameter tree, indexed by battery type, battery families using it).
+## Indexed entries hold one value per battery type, e.g. material_properties -> mass_loading -> cathode -> ASSB_LFP.
+
+BOTH = ('LIB', 'ASSB')
+
+PARAMETERS = {
+    # dimensions, mm
+    'cathode_width': (('dimensions', 'cathode', 'width'), False, BOTH),
+    'cathode_length': (('dimensions', 'cathode', 'length'), False, BOTH),
+    'anode_width': (('dimensions', 'anode', 'width'), False, BOTH),
+    'anode_length': (('dimensions', 'anode', 'length'), False, BOTH),
+    'electrolyte_width': (('dimensions', 'electrolyte', 'width'), False, BOTH),
+    'electrolyte_length': (('dimensions', 'electrolyte', 'length'), False, BOTH),
+    'current_collector_width': (('dimensions', 'current_collector', 'width'), False, BOTH),
+    'current_collector_length': (('dimensions', 'current_collector', 'length'), False, BOTH),
+    'total_cell_width': (('dimensions', 'total_cell', 'width'), False, BOTH),
+    'total_cell_length': (('dimensions', 'total_cell', 'length'), False, BOTH),
+    'cell_height_benchmark': (('dimensions', 'cell_height_benchmark'), False, BOTH),
+    # thicknesses, mm
+    'anode_thickness': (('thicknesses', 'anode'), True, ('ASSB',)),        ## lithium foil, LIB anode thickness is calculated
+    'aluminum_foil_thickness': (('thicknesses', 'aluminum_foil'), False, BOTH),
+    'copper_foil_thickness': (('thicknesses', 'copper_foil'), False, ('LIB',)),
+    'Al_layer_thickness': (('thicknesses', 'Al_layer'), False, BOTH),
+    'PET_layer_thickness': (('thicknesses', 'PET_layer'), False, BOTH),
+    'cell_container_thickness': (('thicknesses', 'cell_container_thickness'), False, BOTH),
+    'separator_thickness': (('thicknesses', 'separator'), True, ('LIB',)),
+    'electrolyte_thickness': (('thicknesses', 'electrolyte'), True, ('ASSB',)),
+    # material properties
+    'ratio_cathode_active_material': (('material_properties', 'ratio_cathode_active_material'), False, BOTH),
+    'ratio_cathode_bc': (('material_properties', 'ratio_cathode_bc'), False, BOTH),
+    'ratio_cathode_pvdf': (('material_properties', 'ratio_cathode_pvdf'), False, BOTH),
+    'mass_loading_cathode': (('material_properties', 'mass_loading', 'cathode'), True, BOTH),     # mg/cm^2
+    'mass_loading_anode': (('material_properties', 'mass_loading', 'anode'), True, ('LIB',)),     # mg/cm^2
+    'capacity_material': (('material_properties', 'capacity_material'), True, BOTH),             # mAh/g
+    'voltage': (('material_properties', 'voltage'), True, BOTH),                                 # V
+    'porosity_cathode': (('material_properties', 'porosity_cathode'), False, BOTH),
+    'porosity_separator': (('material_properties', 'porosity_separator'), False, ('LIB',)),
+    # densities, g/cm^3
+    'density_lithium': (('densities', 'lithium'), False, ('ASSB',)),
+    'density_aluminum': (('densities', 'aluminum'), False, BOTH),
+    'density_copper': (('densities', 'copper'), False, ('LIB',)),
+    'density_cam': (('densities', 'cam'), True, BOTH),
+    'density_black_carbon': (('densities', 'black_carbon'), False, BOTH),
+    'density_PVDF': (('densities', 'PVDF'), False, BOTH),
+    'density_CMC_SBR': (('densities', 'CMC-SBR'), False, ('LIB',)),
+    'density_electrolyte': (('densities', 'electrolyte'), True, BOTH),
+    'density_PET': (('densities', 'PET'), False, BOTH),
+    'density_PP': (('densities', 'PP'), False, ('LIB',)),
+    'density_cell_container': (('densities', 'cell_container_density'), False, BOTH),
+}
+
+## manufacturing energy per process, kWhprod/kWhcell
+MANUFACTURING_PROCESSES = (
+    'electrode_manufacturing_anode',
+    'electrolyte_manufacturing',
+    'electrode_manufacturing_cathode',
+    'assembly',
+    'formation_and_aging',
+    'miscellaneous',
+)
+
+for _process in MANUFACTURING_PROCESSES:
+    PARAMETERS[_process + '_electricity'] = (('battery_manufacturing_energy', _process, 'electric_energy_consumption'), True, BOTH)
+    PARAMETERS[_process + '_gas'] = (('battery_manufacturing_energy', _process, 'gas_consumption'), True, BOTH)
+
+
+def battery_family(battery_type):
+    # the model branches on the substring of the battery type
+    if 'LIB' in battery_type:
+        return 'LIB'
+    elif 'ASSB' in battery_type:
+        return 'ASSB'
+    raise ValueError(f"Unknown battery family for battery type '{battery_type}'.")
+
+
+def parameter_names(battery_type):
+    # names of the inputs used by the calculations of one battery type
+    family = battery_family(battery_type)
+    return [name for name, (path, indexed, families) in PARAMETERS.items() if family in families]
+
+
+def parameter_path(name, battery_type):
+    # full key path of a flat parameter in the yaml tree
+    if name not in PARAMETERS:
+        raise KeyError(f"Unknown parameter '{name}'.")
+    path, indexed, families = PARAMETERS[name]
+    if indexed:
+        return path + (battery_type,)
+    return path
+
+
+def get_parameter(para, name, battery_type):
+    value = para
+    for key in parameter_path(name, battery_type):
+        value = value[key]
+    return value
+
+
+def get_parameter_values(para, battery_type):
+    return {name: get_parameter(para, name, battery_type) for name in parameter_names(battery_type)}
+
+
+def parameter_update(updates, battery_type):
+    # convert {flat name: value} into the nested dict accepted by BatteryModel.update_parameters
+    nested = {}
+    for name, value in updates.items():
+        path = parameter_path(name, battery_type)
+        node = nested
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return nested
+
+
+## units and valid range [low, high] of each parameter, low_open excludes low itself
+## the ranges are wide physical limits in the units of the yaml files, they catch wrong units (um instead of mm,
+## percent instead of fractions) and typos, not unusual designs
+def _schema(unit, low, high, low_open=True):
+    return (unit, low, high, low_open)
+
+
+SCHEMA = {}
+for _name in PARAMETERS:
+    if _name.endswith(('_width', '_length')):
+        SCHEMA[_name] = _schema('mm', 0, 1000)
+    elif _name.startswith('density_'):
+        SCHEMA[_name] = _schema('g/cm^3', 0, 25)
+    elif _name.endswith(('_electricity', '_gas')):
+        SCHEMA[_name] = _schema('kWhprod/kWhcell', 0, 100, low_open=False)
+SCHEMA.update({
+    'cell_height_benchmark': _schema('mm', 0, 500),
+    'anode_thickness': _schema('mm', 0, 1),
+    'aluminum_foil_thickness': _schema('mm', 0, 0.1),
+    'copper_foil_thickness': _schema('mm', 0, 0.1),
+    'Al_layer_thickness': _schema('mm', 0, 1, low_open=False),
+    'PET_layer_thickness': _schema('mm', 0, 1, low_open=False),
+    'cell_container_thickness': _schema('mm', 0, 2, low_open=False),
+    'separator_thickness': _schema('mm', 0, 0.2),
+    'electrolyte_thickness': _schema('mm', 0, 1),
+    'ratio_cathode_active_material': _schema('-', 0, 1),
+    'ratio_cathode_bc': _schema('-', 0, 1, low_open=False),
+    'ratio_cathode_pvdf': _schema('-', 0, 1, low_open=False),
+    'mass_loading_cathode': _schema('mg/cm^2', 0, 100),
+    'mass_loading_anode': _schema('mg/cm^2', 0, 100),
+    'capacity_material': _schema('mAh/g', 0, 4000),
+    'voltage': _schema('V', 0, 6),
+    'porosity_cathode': _schema('-', 0, 0.99, low_open=False),
+    'porosity_separator': _schema('-', 0, 0.99, low_open=False),
+})
+
+
+class ParameterRecord:
+    # flat, validated parameters of one battery type, attributes are the names of PARAMETERS
+    # parameters the battery family does not use are None
+    __slots__ = ('battery_type',) + tuple(PARAMETERS)
+
+    def __init__(self, battery_type, values):
+        self.battery_type = battery_type
+        for name in PARAMETERS:
+            setattr(self, name, values.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in PARAMETERS if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return f'ParameterRecord({self.battery_type!r}, {self.as_dict()!r})'
+
+
+def _lookup(trees, path):
+    # value at path in the first tree that has it, trees are (updates, parameters) in update_parameters
+    for tree in trees:
+        value = tree
+        for key in path:
+            if not isinstance(value, dict):
+                raise KeyError(path)    # a value replaced a whole sub-tree
+            if key not in value:
+                break
+            value = value[key]
+        else:
+            return value
+    raise KeyError(path)
+
+
+def _check_value(name, value, where):
+    # error message for an invalid value, None if it is valid
+    unit, low, high, low_open = SCHEMA[name]
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):    # numpy bools are not Real either
+        return f"{where}: {value!r} is not a number ({unit})"
+    if not (low < value if low_open else low <= value) or not value <= high or value != value:
+        interval = ('(' if low_open else '[') + f'{low}, {high}]'
+        return f"{where}: {value} {unit} outside {interval}"
+    return None
+
+
+def _check_ratios(values, battery_type):
+    ratios = [values.get(name) for name in ('ratio_cathode_active_material', 'ratio_cathode_bc', 'ratio_cathode_pvdf')]
+    if None not in ratios and sum(ratios) > 1 + 1e-9:
+        return f"material_properties: the cathode ratios of {battery_type} add up to {sum(ratios)} > 1"
+    return None
+
+
+def _raise_errors(errors):
+    if errors:
+        raise ValueError("Invalid parameters:\n  " + "\n  ".join(dict.fromkeys(errors)))
+
+
+def validate_values(record, values):
+    # Check flat parameter values that replace those of a record (e.g. the overrides of one batch row)
+    # raises ValueError listing every invalid value
+    merged = record.as_dict()
+    merged.update(values)
+    errors = [error for error in (_check_value(name, value, name) for name, value in values.items()) if error]
+    if not errors:      # the ratio sum needs numbers
+        errors.append(_check_ratios(merged, record.battery_type))
+    _raise_errors([error for error in errors if error])
+
+
+def compile_parameters(para, updates=None):
+    # Validate the parameter tree (with the not yet applied updates on top) and compile it into records
+    # returns (record of the parameters shared by all battery types, {battery_type: record})
+    # raises ValueError listing every missing key and invalid value
+    trees = (updates, para) if updates else (para,)
+    errors = []
+    try:
+        battery_types = dict(para.get('battery_type') or {})
+        battery_types.update((updates or {}).get('battery_type') or {})
+    except (AttributeError, TypeError, ValueError):
+        battery_types = {}
+    if not battery_types:
+        raise ValueError("Battery type is missing.")
+
+    def compile_record(battery_type, names):
+        values = {}
+        for name in names:
+            path = parameter_path(name, battery_type) if battery_type else PARAMETERS[name][0]
+            where = '.'.join(path)
+            try:
+                value = _lookup(trees, path)
+            except KeyError:
+                errors.append(f"{where}: missing")
+                continue
+            error = _check_value(name, value, where)
+            if error:
+                errors.append(error)
+            else:
+                values[name] = float(value)
+        return ParameterRecord(battery_type, values)
+
+    common = compile_record(None, [name for name, (path, indexed, families) in PARAMETERS.items() if not indexed])
+    records = {}
+    for battery_type in battery_types:
+        try:
+            names = parameter_names(battery_type)
+        except ValueError as error:
+            errors.append(f"battery_type.{battery_type}: {error}")
+            continue
+        record = compile_record(battery_type, names)
+        errors.append(_check_ratios(record.as_dict(), battery_type))
+        records[battery_type] = record
+    _raise_errors([error for error in errors if error])
+    return common, records
+
+
+## yaml key path -> flat parameter name
+PARAMETER_PATHS = {path: name for name, (path, indexed, families) in PARAMETERS.items()}
+
+
+def update_records(common, records, para, updates):
+    # Validate updates for BatteryModel.update_parameters and apply them to the compiled records
+    # only the updated values are checked; updates that change the structure of the tree
+    # (battery types, whole sub-trees replaced by a value) fall back to compile_parameters
+    def leaves(tree, prefix=()):
+        for key, value in tree.items():
+            if isinstance(value, dict):
+                yield from leaves(value, prefix + (key,))
+            else:
+                yield prefix + (key,), value
+
+    changes = []    # (record, name, value)
+    errors = []
+    for path, value in leaves(updates):
+        if path[0] == 'battery_type':
+            return compile_parameters(para, updates)
+        if path in PARAMETER_PATHS and not PARAMETERS[PARAMETER_PATHS[path]][1]:
+            name = PARAMETER_PATHS[path]
+            targets = [common] + [record for bt, record in records.items()
+                                  if battery_family(bt) in PARAMETERS[name][2]]
+        elif path[:-1] in PARAMETER_PATHS and PARAMETERS[PARAMETER_PATHS[path[:-1]]][1]:
+            name = PARAMETER_PATHS[path[:-1]]
+            record = records.get(path[-1])
+            if record is None or battery_family(path[-1]) not in PARAMETERS[name][2]:
+                continue    # value not used by the calculations
+            targets = [record]
+        elif any(path == known[:len(path)] or known == path[:len(known)] for known in PARAMETER_PATHS):
+            return compile_parameters(para, updates)
+        else:
+            continue    # value not used by the calculations
+        error = _check_value(name, value, '.'.join(path))
+        if error:
+            errors.append(error)
+        else:
+            changes.extend((record, name, float(value)) for record in targets)
+
+    for record in {id(record): record for record, name, value in changes}.values():
+        if record.battery_type is not None:
+            values = record.as_dict()
+            values.update((name, value) for target, name, value in changes if target is record)
+            errors.append(_check_ratios(values, record.battery_type))
+    _raise_errors([error for error in errors if error])
+    for record, name, value in changes:
+        setattr(record, name, value)
+    return common, records
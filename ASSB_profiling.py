@@ -0,0 +1,133 @@
+import contextlib
+import functools
+import inspect
+import time
+
+from ASSB_dimensioning_model import BatteryModel
+
+## Opt-in call-tree profiling of BatteryModel
+##   profiler = Profiler()
+##   with profiler.profile(model):
+##       model.calculate_pouch_cell('ASSB_LFP')
+##   profiler.report()                          # per method and per call path: calls, inclusive and exclusive time
+##   profiler.write_collapsed('model.folded')   # for flamegraph.pl / speedscope
+## the methods of the profiled models are replaced by timing wrappers on the instances while the profile is active
+## and restored afterwards, models that are not profiled run the class methods unchanged (no overhead)
+## calls of cached methods are counted also when they are answered from the cache, as 'cache_hits'
+
+## BatteryModel methods that are timed
+INSTRUMENTED = tuple(name for name, member in vars(BatteryModel).items()
+                     if not name.startswith('__') and (inspect.isfunction(member) or isinstance(member, staticmethod)))
+
+
+class Profiler:
+    # statistics accumulate over all profile() blocks until reset(); not thread safe
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = {}     # call path (tuple of method names) -> [calls, inclusive, exclusive, cache hits]
+        self._stack = []    # [name, time spent in children] of the running calls
+
+    def _wrap(self, model, name, method):
+        nodes, stack = self.nodes, self._stack
+        cached = getattr(getattr(BatteryModel, name), 'cached', False)
+        clock = time.perf_counter
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            frame = [name, 0.0]
+            stack.append(frame)
+            hits, misses = model.cache_hits, model.cache_misses
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                path = tuple(entry[0] for entry in stack)
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                node = nodes.get(path)
+                if node is None:
+                    node = nodes[path] = [0, 0.0, 0.0, 0]
+                node[0] += 1
+                node[1] += elapsed
+                node[2] += elapsed - frame[1]
+                if cached and model.cache_misses == misses and model.cache_hits == hits + 1:
+                    node[3] += 1
+        return wrapper
+
+    @contextlib.contextmanager
+    def profile(self, *models):
+        # time the BatteryModel methods of models inside the with block
+        for model in models:
+            if INSTRUMENTED[0] in vars(model):
+                raise ValueError("The model is already profiled.")
+        try:
+            for model in models:
+                for name in INSTRUMENTED:
+                    setattr(model, name, self._wrap(model, name, getattr(model, name)))
+            yield self
+        finally:
+            for model in models:
+                for name in INSTRUMENTED:
+                    vars(model).pop(name, None)
+
+    def methods(self):
+        # totals per method; the inclusive time of a method called inside itself is counted once
+        methods = {}
+        for path, (calls, inclusive, exclusive, hits) in self.nodes.items():
+            name = path[-1]
+            entry = methods.setdefault(name, {'calls': 0, 'inclusive': 0.0, 'exclusive': 0.0, 'cache_hits': 0})
+            entry['calls'] += calls
+            entry['exclusive'] += exclusive
+            entry['cache_hits'] += hits
+            if name not in path[:-1]:
+                entry['inclusive'] += inclusive
+        return dict(sorted(methods.items(), key=lambda item: -item[1]['exclusive']))
+
+    def tree(self):
+        # nested call tree: [{'name', 'calls', 'inclusive', 'exclusive', 'cache_hits', 'children'}], slowest first
+        children = {}
+        for path in self.nodes:
+            children.setdefault(path[:-1], []).append(path)
+
+        def build(parent):
+            entries = []
+            for path in children.get(parent, []):
+                calls, inclusive, exclusive, hits = self.nodes[path]
+                entries.append({'name': path[-1], 'calls': calls, 'inclusive': inclusive, 'exclusive': exclusive,
+                                'cache_hits': hits, 'children': build(path)})
+            return sorted(entries, key=lambda entry: -entry['inclusive'])
+        return build(())
+
+    def report(self):
+        # structured report, times in seconds
+        roots = self.tree()
+        return {
+            'total': sum(entry['inclusive'] for entry in roots),
+            'methods': self.methods(),
+            'tree': roots,
+        }
+
+    def format_tree(self):
+        # the call tree as indented text
+        lines = [f"{'calls':>9} {'hits':>9} {'inclusive ms':>13} {'exclusive ms':>13}  method"]
+
+        def add(entries, depth):
+            for entry in entries:
+                lines.append(f"{entry['calls']:9d} {entry['cache_hits']:9d} {entry['inclusive'] * 1e3:13.3f} "
+                             f"{entry['exclusive'] * 1e3:13.3f}  {'  ' * depth}{entry['name']}")
+                add(entry['children'], depth + 1)
+        add(self.tree(), 0)
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        # collapsed stacks ('a;b;c <exclusive microseconds>' per line), the input format of flamegraph.pl
+        return ''.join(f"{';'.join(path)} {round(exclusive * 1e6)}\n"
+                       for path, (calls, inclusive, exclusive, hits) in sorted(self.nodes.items()))
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as file:
+            file.write(self.collapsed())
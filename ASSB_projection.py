@@ -0,0 +1,117 @@
+import numpy as np
+
+from ASSB_batch_model import (BATCH_POUCH_CELL_KEYS, MANUFACTURING_KEYS, calculate_pouch_cell_batch,
+                              manufacturing_energy_batch)
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import parameter_names
+
+## Fleet-scale projection of cell numbers, material demand and manufacturing energy over years
+## the parameters move between anchor scenarios (e.g. baseline -> optimal -> highest performance) along
+## technology trajectories, the position on the anchor sequence is interpolated linearly between keyframe years:
+##   trajectories = {
+##       'slow': {2025: 'baseline', 2040: 'optimal'},
+##       'fast': {2025: 'baseline', 2030: 'optimal', 2035: 'highest'},
+##       'halfway': {2025: 0, 2050: 0.5},          # positions as numbers: 0 = first anchor, 1 = second, ...
+##   }
+## between two anchors every flat parameter (see ASSB_parameters) is interpolated linearly, at the anchors the
+## values are the scenario values; all years x trajectories x battery types are evaluated in one batch
+
+## outputs of calculate_pouch_cell that are not masses of the cell
+NON_MASS_KEYS = ('Cell_capacity', 'Specific_energy', 'Energy_density', 'cell_volume')
+MASS_KEYS = tuple(key for key in BATCH_POUCH_CELL_KEYS if key not in NON_MASS_KEYS)
+
+
+class FleetProjection:
+    # anchors: {name: scenario yaml path or BatteryModel}, in the order of the technology progression
+    def __init__(self, anchors):
+        if len(anchors) < 1:
+            raise ValueError("At least one anchor scenario is needed.")
+        self.anchors = list(anchors)
+        models = [model if isinstance(model, BatteryModel) else BatteryModel(model) for model in anchors.values()]
+        self.para = models[0].para
+        self.battery_types = list(models[0].records)
+        # {battery type: (parameter names, array anchors x parameters)}
+        self.tables = {}
+        for bt in self.battery_types:
+            names = parameter_names(bt)
+            for name, model in zip(self.anchors, models):
+                if bt not in model.records:
+                    raise KeyError(f"Battery type '{bt}' is missing in the anchor scenario '{name}'.")
+            values = [[getattr(model.parameters(bt), parameter) for parameter in names] for model in models]
+            self.tables[bt] = (names, np.array(values, dtype=float))
+
+    def positions(self, trajectory, years):
+        # position on the anchor sequence in each year (0 = first anchor), clamped to the anchors
+        keyframes = sorted(trajectory.items())
+        points = []
+        for year, position in keyframes:
+            if isinstance(position, str):
+                if position not in self.anchors:
+                    raise KeyError(f"Unknown anchor scenario '{position}'.")
+                position = self.anchors.index(position)
+            points.append(float(position))
+        positions = np.interp(np.asarray(years, dtype=float), [year for year, position in keyframes], points)
+        return np.clip(positions, 0, len(self.anchors) - 1)
+
+    def parameters(self, battery_type, positions):
+        # flat parameter columns at the given positions, exactly the anchor values at whole positions
+        names, table = self.tables[battery_type]
+        positions = np.asarray(positions, dtype=float)
+        lower = np.minimum(np.floor(positions).astype(int), len(table) - 1)
+        upper = np.minimum(lower + 1, len(table) - 1)
+        fraction = (positions - lower)[..., None]
+        values = (1 - fraction) * table[lower] + fraction * table[upper]
+        return {name: values[..., j] for j, name in enumerate(names)}
+
+    def project(self, years, production, trajectories, battery_types=None):
+        # years: sequence of years
+        # production: {battery type: GWh per year}, as {year: GWh} (interpolated linearly, 0 outside the given
+        #   years), an array over years, or an array (trajectories, years) for production scenarios per trajectory
+        # trajectories: {name: {year: anchor name or position}}
+        # returns arrays of shape (trajectories, years, battery types):
+        #   'cells', 'per_cell' (calculate_pouch_cell and manufacturing_energy results of one cell),
+        #   'materials' (t per year for each mass key), 'energy' (GWh per year for each manufacturing energy key)
+        years = np.asarray(years)
+        battery_types = list(battery_types or production)
+        for bt in battery_types:
+            if bt not in self.tables:
+                raise KeyError(f"Unknown battery type '{bt}'.")
+        names = list(trajectories)
+        shape = (len(names), len(years), len(battery_types))
+
+        positions = np.stack([self.positions(trajectories[name], years) for name in names])    # (trajectories, years)
+        types = np.broadcast_to(np.array(battery_types), shape).reshape(-1)
+        columns = {}
+        for b, bt in enumerate(battery_types):
+            for name, values in self.parameters(bt, positions).items():
+                if name not in columns:
+                    columns[name] = np.full(shape, np.nan)
+                columns[name][:, :, b] = values
+        columns = {name: values.reshape(-1) for name, values in columns.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_cell = calculate_pouch_cell_batch(self.para, types, columns)
+            per_cell.update(manufacturing_energy_batch(self.para, types, columns, cell_capacity=per_cell['Cell_capacity']))
+        per_cell = {key: values.reshape(shape) for key, values in per_cell.items()}
+
+        gwh = np.zeros(shape)
+        for b, bt in enumerate(battery_types):
+            volume = production.get(bt, 0)
+            if isinstance(volume, dict):
+                volume = np.interp(years.astype(float), sorted(volume), [volume[year] for year in sorted(volume)],
+                                   left=0, right=0)
+            gwh[:, :, b] = np.broadcast_to(np.asarray(volume, dtype=float), shape[:2])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cells = np.where(gwh > 0, gwh * 1e9 / per_cell['Cell_capacity'], 0.0)     # Cell_capacity in Wh
+        materials = {key: np.where(gwh > 0, per_cell[key] * cells / 1e6, 0.0) for key in MASS_KEYS}    # g -> t
+        energy = {key: np.where(gwh > 0, per_cell[key] * cells / 1e6, 0.0) for key in MANUFACTURING_KEYS}  # kWh -> GWh
+        return {
+            'years': years,
+            'trajectories': names,
+            'battery_types': battery_types,
+            'positions': positions,
+            'production': gwh,
+            'cells': cells,
+            'per_cell': per_cell,
+            'materials': materials,
+            'energy': energy,
+        }
@@ -0,0 +1,283 @@
+import json
+import math
+import operator
+import os
+
+import numpy as np
+
+from ASSB_batch_model import BATCH_POUCH_CELL_KEYS, MANUFACTURING_KEYS, PERCENTAGE_KEYS
+from ASSB_monte_carlo import RunningMoments
+
+## Columnar result store for large sweeps
+## a store is a directory with one raw binary file per column and schema.json (column types, category labels,
+## number of rows, metadata); columns are read as memory-mapped arrays, so reading a column does not load it
+## and queries run block by block over the mapped files
+##
+## column types: 'float64', 'int64' and 'category' (labels such as the battery type, stored as int32 codes)
+## rows are buffered and written in chunks; the row count in schema.json is only advanced after all columns
+## of a chunk are written, an interrupted write leaves the store at the previous chunk
+
+## output columns of calculate_pouch_cell, manufacturing_energy and calculate_percentage_composition
+RESULT_COLUMNS = BATCH_POUCH_CELL_KEYS + MANUFACTURING_KEYS + tuple(f'{key}_percentage' for key in PERCENTAGE_KEYS)
+
+COLUMN_TYPES = {'float64': np.float64, 'int64': np.int64, 'category': np.int32}
+
+FILTER_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    'in': np.isin,
+}
+
+AGGREGATIONS = ('count', 'sum', 'mean', 'std', 'min', 'max')
+
+
+class ResultStore:
+    # path: store directory, opened if it exists, otherwise created with the given columns
+    # columns: {name: column type} or a list of float64 column names
+    # chunk_size: buffered rows written at once
+    def __init__(self, path, columns=None, chunk_size=65536, metadata=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._buffer = []
+        self._buffered = 0
+        self._maps = {}
+        if os.path.exists(self._schema_path()):
+            with open(self._schema_path(), 'r') as file:
+                schema = json.load(file)
+            if columns is not None and dict(self._column_types(columns)) != schema['columns']:
+                raise ValueError(f"Result store '{path}' has different columns.")
+        else:
+            if columns is None:
+                raise ValueError(f"Result store '{path}' does not exist, give its columns to create it.")
+            schema = {'columns': dict(self._column_types(columns)), 'categories': {}, 'rows': 0,
+                      'metadata': metadata or {}}
+            for name, kind in schema['columns'].items():
+                if kind == 'category':
+                    schema['categories'][name] = []
+        self.schema = schema
+        self._files = {name: os.path.join(path, f'column_{i:04d}.bin') for i, name in enumerate(schema['columns'])}
+        if not os.path.exists(self._schema_path()):
+            os.makedirs(path, exist_ok=True)
+            self._write_schema()
+
+    @staticmethod
+    def _column_types(columns):
+        if not isinstance(columns, dict):
+            columns = dict.fromkeys(columns, 'float64')
+        for name, kind in columns.items():
+            if kind not in COLUMN_TYPES:
+                raise ValueError(f"Unknown column type '{kind}' of column '{name}'.")
+            yield name, kind
+
+    def _schema_path(self):
+        return os.path.join(self.path, 'schema.json')
+
+    def _write_schema(self):
+        with open(self._schema_path() + '.tmp', 'w') as file:
+            json.dump(self.schema, file, indent=1)
+        os.replace(self._schema_path() + '.tmp', self._schema_path())
+
+    def __len__(self):
+        return self.schema['rows']
+
+    @property
+    def columns(self):
+        return list(self.schema['columns'])
+
+    @property
+    def metadata(self):
+        return self.schema['metadata']
+
+    def categories(self, name):
+        # labels of a category column, the codes index this list
+        return list(self.schema['categories'][name])
+
+    ## writing
+
+    def append(self, rows):
+        # rows: {column: array or scalar}, scalars and one-element arrays are broadcast to the other columns
+        # float64 columns that are not given are NaN (e.g. the keys a battery family does not have)
+        unknown = [name for name in rows if name not in self.schema['columns']]
+        if unknown:
+            raise KeyError(f"Unknown columns {unknown} of result store '{self.path}'.")
+        values = {name: np.asarray(value) for name, value in rows.items()}
+        size = np.broadcast_shapes((1,), *(value.shape for value in values.values()))
+        if len(size) > 1:
+            raise ValueError("Result columns must be scalars or one-dimensional arrays.")
+        chunk = {}
+        for name, kind in self.schema['columns'].items():
+            if name in values:
+                value = np.broadcast_to(values[name], size)
+                if kind == 'category':
+                    value = self._encode(name, value)
+                chunk[name] = np.ascontiguousarray(value, dtype=COLUMN_TYPES[kind])
+            elif kind == 'float64':
+                chunk[name] = np.full(size, np.nan)
+            else:
+                raise ValueError(f"Column '{name}' is missing.")
+        self._buffer.append(chunk)
+        self._buffered += size[0]
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def _encode(self, name, labels):
+        labels = labels.astype(str)
+        categories = self.schema['categories'][name]
+        unique, inverse = np.unique(labels, return_inverse=True)
+        for label in unique.tolist():
+            if label not in categories:
+                categories.append(label)
+        codes = np.array([categories.index(label) for label in unique.tolist()], dtype=np.int32)
+        return codes[inverse.reshape(labels.shape)]
+
+    def flush(self):
+        # write the buffered rows
+        if not self._buffer:
+            return
+        rows = self.schema['rows']
+        for name, kind in self.schema['columns'].items():
+            itemsize = np.dtype(COLUMN_TYPES[kind]).itemsize
+            with open(self._files[name], 'ab') as file:
+                file.truncate(rows * itemsize)  # drop the rest of an interrupted write
+                for chunk in self._buffer:
+                    file.write(chunk[name].tobytes())
+        self.schema['rows'] = rows + self._buffered
+        self._buffer = []
+        self._buffered = 0
+        self._write_schema()
+
+    def truncate(self, rows):
+        # drop the written rows after the first rows (and the buffered ones), e.g. to redo an interrupted run
+        if rows > self.schema['rows']:
+            raise ValueError(f"Result store '{self.path}' has only {self.schema['rows']} rows.")
+        self._buffer = []
+        self._buffered = 0
+        if rows < self.schema['rows']:
+            self.schema['rows'] = rows
+            self._write_schema()    # the column files are cut at the next flush
+
+    def close(self):
+        self.flush()
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ## reading
+
+    def column(self, name):
+        # memory-mapped column of the written rows (codes for category columns), read only
+        if name not in self.schema['columns']:
+            raise KeyError(f"Unknown column '{name}' of result store '{self.path}'.")
+        rows = self.schema['rows']
+        if self._maps.get(name, (None, -1))[1] != rows:
+            dtype = COLUMN_TYPES[self.schema['columns'][name]]
+            if rows == 0:
+                mapped = np.empty(0, dtype=dtype)
+            else:
+                mapped = np.memmap(self._files[name], dtype=dtype, mode='r', shape=(rows,))
+            self._maps[name] = (mapped, rows)
+        return self._maps[name][0]
+
+    def _condition(self, where):
+        # where: list of (column, operator, value), e.g. [('battery_type', '==', 'ASSB_NMC811'), ('porosity_cathode', '<', 0.25)]
+        conditions = []
+        for name, op, value in where or ():
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator '{op}'.")
+            if self.schema['columns'].get(name) == 'category':
+                categories = self.schema['categories'][name]
+                labels = value if op == 'in' else [value]
+                codes = [categories.index(label) if label in categories else -1 for label in labels]
+                value = codes if op == 'in' else codes[0]
+            conditions.append((self.column(name), FILTER_OPERATORS[op], value))
+        return conditions
+
+    def _blocks(self, where, block_size):
+        # (start, stop, row mask) of each block, the mask is None without filters
+        conditions = self._condition(where)
+        for start in range(0, len(self), block_size):
+            stop = min(start + block_size, len(self))
+            mask = None
+            for column, op, value in conditions:
+                match = op(column[start:stop], value)
+                mask = match if mask is None else mask & match
+            yield start, stop, mask
+
+    def select(self, columns=None, where=None, block_size=1 << 20):
+        # rows matching where as a dict of arrays (labels for category columns), only these rows are loaded
+        columns = list(columns or self.columns)
+        parts = {name: [] for name in columns}
+        for start, stop, mask in self._blocks(where, block_size):
+            for name in columns:
+                values = self.column(name)[start:stop]
+                parts[name].append(np.array(values if mask is None else values[mask]))
+        selected = {}
+        for name in columns:
+            values = np.concatenate(parts[name]) if parts[name] else self.column(name)[:0].copy()
+            if self.schema['columns'][name] == 'category':
+                values = np.array(self.schema['categories'][name], dtype=object)[values]
+            selected[name] = values
+        return selected
+
+    def aggregate(self, column, functions=AGGREGATIONS, where=None, group_by=None, block_size=1 << 20):
+        # statistics of a float or int column over the rows matching where, NaN values are skipped
+        # e.g. store.aggregate('Specific_energy', 'mean', where=[('battery_type', '==', 'ASSB_NMC811'),
+        #                                                       ('porosity_cathode', '<', 0.25)])
+        # returns {function: value} (a single value for one function name), per group label with group_by
+        single = isinstance(functions, str)
+        functions = [functions] if single else list(functions)
+        for function in functions:
+            if function not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation '{function}'.")
+        values = self.column(column)
+        groups = {} if group_by is not None else {None: (RunningMoments(), 0.0)}
+        for start, stop, mask in self._blocks(where, block_size):
+            block = values[start:stop]
+            keys = None if group_by is None else self.column(group_by)[start:stop]
+            if mask is not None:
+                block = block[mask]
+                keys = None if keys is None else keys[mask]
+            valid = ~np.isnan(block) if block.dtype.kind == 'f' else slice(None)
+            block = block[valid]
+            if keys is None:
+                self._accumulate(groups, None, block)
+                continue
+            keys = keys[valid]
+            for key in np.unique(keys).tolist():
+                self._accumulate(groups, key, block[keys == key])
+
+        results = {}
+        for key, (moments, total) in groups.items():
+            summary = {
+                'count': moments.count,
+                'sum': total,
+                'mean': moments.mean if moments.count else math.nan,
+                'std': math.sqrt(moments.variance) if moments.count > 1 else math.nan,
+                'min': float(moments.min) if moments.count else math.nan,
+                'max': float(moments.max) if moments.count else math.nan,
+            }
+            summary = summary[functions[0]] if single else {function: summary[function] for function in functions}
+            if group_by is not None and self.schema['columns'][group_by] == 'category':
+                key = self.schema['categories'][group_by][key]
+            results[key] = summary
+        if group_by is None:
+            return results[None]
+        return results
+
+    @staticmethod
+    def _accumulate(groups, key, block):
+        moments, total = groups.get(key, (RunningMoments(), 0.0))
+        moments.update(block.astype(float))
+        groups[key] = (moments, total + float(block.sum()))
+
+
+def result_row(model, battery_type):
+    # calculate_pouch_cell, manufacturing_energy and calculate_percentage_composition of a BatteryModel as one row
+    row = {'battery_type': battery_type}
+    row.update(model.calculate_pouch_cell(battery_type))
+    row.update(model.manufacturing_energy(battery_type))
+    row.update((f'{key}_percentage', value) for key, value in model.calculate_percentage_composition(battery_type).items())
+    return row
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import pickle
+
+import yaml
+
+from ASSB_parameters import compile_parameters
+
+## Scenario loading with overlays and a parsed-tree cache
+## a scenario file can declare a parent scenario and only list the keys that differ from it:
+##   parent: ASSB_baseline_performance_parameters.yml      # relative to this file
+##   thicknesses:
+##     electrolyte:
+##       ASSB_LFP: 0.05
+## the overlay is merged into the parent with recursive_update (the semantics of BatteryModel.update_parameters),
+## parents can have parents themselves
+##
+## parsed files are cached by the sha256 of the file contents, in memory and as JSON files in CACHE_DIR (plain data,
+## nothing in the cache directory is executed), so new processes do not parse the yaml again; compiled scenarios are
+## cached in memory only, keyed by the hashes of the whole parent chain, and are validated once per process
+## an edited file has a new hash and is parsed again
+
+## directory of the on-disk cache of parsed files, a per-user directory; None: memory cache only
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                         'ASSB_scenarios')
+
+## entries kept in each memory cache and files kept in CACHE_DIR, the least recently used are dropped
+CACHE_SIZE = 256
+
+_parsed = {}    # file digest -> (parent, overlay)
+_compiled = {}  # scenario hash -> pickled (para, common, records)
+
+
+def recursive_update(orig_dict, new_updates):
+    # Recursively update parameters to handle nested dictionary updates
+    for key, value in new_updates.items():
+        if isinstance(value, dict):
+            orig_dict[key] = recursive_update(orig_dict.get(key, {}), value)
+        else:
+            orig_dict[key] = value
+    return orig_dict
+
+
+def clear_cache():
+    # Empty the memory cache, the files in CACHE_DIR are kept
+    _parsed.clear()
+    _compiled.clear()
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+    while len(cache) > CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+
+def _recall(cache, key):
+    # value of key (None if missing), moved to the end of the eviction order
+    value = cache.pop(key, None)
+    if value is not None:
+        cache[key] = value
+    return value
+
+
+def _read_cache(name):
+    if CACHE_DIR is None:
+        return None
+    cache_path = os.path.join(CACHE_DIR, name)
+    try:
+        with open(cache_path, 'r') as file:
+            data = json.load(file)
+        os.utime(cache_path)    # the modification time orders the files for pruning
+        return data
+    except (OSError, ValueError):   # no or unreadable cache file
+        return None
+
+
+def _write_cache(name, data):
+    # best effort, an unwritable directory only disables the disk cache
+    if CACHE_DIR is None:
+        return
+    # only trees that JSON gives back unchanged: string keys, no dates or other yaml-only values
+    if not _json_keys(data):
+        return
+    try:
+        text = json.dumps(data)
+    except (TypeError, ValueError):
+        return
+    cache_path = os.path.join(CACHE_DIR, name)
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        temporary = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as file:
+            file.write(text)
+        os.replace(temporary, cache_path)
+        _prune_cache()
+    except OSError:
+        pass
+
+
+def _json_keys(tree):
+    # whether every mapping in tree has string keys only
+    if isinstance(tree, dict):
+        return all(isinstance(key, str) and _json_keys(value) for key, value in tree.items())
+    if isinstance(tree, list):
+        return all(_json_keys(value) for value in tree)
+    return True
+
+
+def _prune_cache():
+    names = [name for name in os.listdir(CACHE_DIR) if name.endswith('.yml.json')]
+    if len(names) <= CACHE_SIZE:
+        return
+    paths = sorted((os.path.join(CACHE_DIR, name) for name in names), key=os.path.getmtime)
+    for path in paths[:len(paths) - CACHE_SIZE]:
+        try:
+            os.remove(path)
+        except OSError:     # removed by another process
+            pass
+
+
+def _parse(path):
+    # returns (digest of the file contents, parent path or None, overlay dict)
+    with open(path, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    parsed = _recall(_parsed, digest)
+    if parsed is None:
+        data = _read_cache(f"{digest}.yml.json")
+        if isinstance(data, dict) and isinstance(data.get('tree'), dict):
+            parsed = (data.get('parent'), data['tree'])
+        else:
+            tree = yaml.safe_load(content)
+            if not isinstance(tree, dict):
+                raise ValueError(f"Scenario file '{path}' does not contain a mapping.")
+            parent = tree.pop('parent', None)
+            parsed = (parent, tree)
+            _write_cache(f"{digest}.yml.json", {'parent': parent, 'tree': tree})
+        _remember(_parsed, digest, parsed)
+    parent, tree = parsed
+    if parent is not None:
+        parent = os.path.join(os.path.dirname(path), parent)
+    return digest, parent, tree
+
+
+def _chain(path):
+    # files from the root scenario to path with their parsed contents
+    chain = []
+    seen = set()
+    while path is not None:
+        path = os.path.abspath(path)
+        if path in seen:
+            raise ValueError(f"The parents of scenario '{path}' form a cycle.")
+        seen.add(path)
+        digest, parent, tree = _parse(path)
+        chain.append((digest, tree))
+        path = parent
+    return chain[::-1]
+
+
+def _chain_hash(chain):
+    return hashlib.sha256(' '.join(digest for digest, tree in chain).encode()).hexdigest()
+
+
+def scenario_hash(path):
+    # sha256 of the contents of a scenario file and all its parents
+    return _chain_hash(_chain(path))
+
+
+def load_compiled(path):
+    # Load a scenario and return (parameters dict, common record, {battery type: record}), see compile_parameters
+    # the results are fresh objects the caller may modify
+    chain = _chain(path)
+    key = _chain_hash(chain)
+    data = _recall(_compiled, key)
+    if data is None:
+        para = {}
+        for digest, tree in chain:
+            # the cached overlays are merged into a copy
+            para = recursive_update(para, pickle.loads(pickle.dumps(tree)))
+        common, records = compile_parameters(para)
+        data = pickle.dumps((para, common, records), protocol=pickle.HIGHEST_PROTOCOL)
+        _remember(_compiled, key, data)
+    return pickle.loads(data)
+
+
+def load_scenario(path):
+    # Load a scenario and return the merged and validated parameters (dict)
+    return load_compiled(path)[0]
@@ -0,0 +1,197 @@
+import numpy as np
+
+from ASSB_batch_model import batch_inputs, evaluate_manufacturing_energy, evaluate_outputs, evaluate_pouch_cell
+from ASSB_parameters import battery_family, get_parameter_values
+
+## Sensitivity of the dimensioning model outputs to the flat parameters of ASSB_parameters
+## local: exact derivatives with forward mode dual numbers through the batch kernel
+## global: Morris screening and Sobol indices (Saltelli sampling) evaluated with the batch model
+
+DEFAULT_OUTPUTS = ('Specific_energy', 'Energy_density', 'Total_mass', 'one_cell_man_energy')
+
+
+class Dual:
+    # value: array of n rows, grad: (n, k) derivatives of the value with respect to k parameters
+    # supports the operations used by evaluate_pouch_cell and evaluate_manufacturing_energy
+    def __init__(self, value, grad):
+        self.value = value
+        self.grad = grad
+
+    @staticmethod
+    def _parts(x):
+        if isinstance(x, Dual):
+            return x.value, x.grad
+        return np.asarray(x, dtype=float), None
+
+    def __add__(self, other):
+        value, grad = self._parts(other)
+        return Dual(self.value + value, self.grad if grad is None else self.grad + grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        value, grad = self._parts(other)
+        return Dual(self.value - value, self.grad if grad is None else self.grad - grad)
+
+    def __rsub__(self, other):
+        return Dual(np.asarray(other, dtype=float) - self.value, -self.grad)
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __mul__(self, other):
+        value, grad = self._parts(other)
+        result = self.grad * value[..., None]
+        if grad is not None:
+            result = result + grad * self.value[..., None]
+        return Dual(self.value * value, result)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        value, grad = self._parts(other)
+        result = self.grad / value[..., None]
+        if grad is not None:
+            result = result - grad * (self.value / value**2)[..., None]
+        return Dual(self.value / value, result)
+
+    def __rtruediv__(self, other):
+        other = np.asarray(other, dtype=float)
+        return Dual(other / self.value, -self.grad * (other / self.value**2)[..., None])
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # numpy arrays on the left hand side and np.trunc of the layer count end up here
+        if method != '__call__':
+            return NotImplemented
+        if ufunc in (np.trunc, np.floor, np.ceil):
+            return Dual(ufunc(inputs[0].value), np.zeros_like(inputs[0].grad))   # piecewise constant
+        operations = {np.add: '__add__', np.subtract: '__sub__', np.multiply: '__mul__', np.true_divide: '__truediv__'}
+        if ufunc not in operations:
+            return NotImplemented
+        a, b = inputs
+        if isinstance(a, Dual):
+            return getattr(a, operations[ufunc])(b)
+        return getattr(b, operations[ufunc].replace('__', '__r', 1))(a)
+
+
+def relative_bounds(model, battery_type, fraction=0.1, parameters=None):
+    # +/- fraction of the scenario value for every (or the given) parameter
+    values = get_parameter_values(model.para, battery_type)
+    parameters = parameters or list(values)
+    return {name: (values[name] * (1 - fraction), values[name] * (1 + fraction)) for name in parameters}
+
+
+def local_sensitivity(model, battery_type, parameters=None, outputs=DEFAULT_OUTPUTS, columns=None):
+    # exact derivatives d output / d parameter at the scenario values (or at each row of columns)
+    # the number of layers is piecewise constant, its derivative is 0; 'layer_step' gives the linearized
+    # parameter change (down, up) at which the layer count jumps, i.e. the range where the gradient holds
+    types, groups = batch_inputs(model.para, battery_type, columns)
+    (bt, (index, inputs)), = groups.items()
+    parameters = list(parameters or inputs)
+    n, k = len(index), len(parameters)
+    p = dict(inputs)
+    for j, name in enumerate(parameters):
+        grad = np.zeros((n, k))
+        grad[:, j] = 1
+        p[name] = Dual(np.array(inputs[name], dtype=float), grad)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results = evaluate_pouch_cell(p, battery_family(bt))
+        results.update(evaluate_manufacturing_energy(p, results['Cell_capacity']))
+        results['layer_ratio'] = results['available_height'] / results['total_unit_thickness']
+        for key, result in results.items():
+            if not isinstance(result, Dual):    # not depending on any of the parameters
+                results[key] = Dual(np.broadcast_to(result, (n,)), np.zeros((n, k)))
+        ratio = results['layer_ratio']
+        floor = np.floor(ratio.value)
+        step_down = np.where(ratio.grad > 0, (floor - ratio.value)[:, None] / ratio.grad,
+                             (floor + 1 - ratio.value)[:, None] / ratio.grad)
+        step_up = np.where(ratio.grad > 0, (floor + 1 - ratio.value)[:, None] / ratio.grad,
+                           (floor - ratio.value)[:, None] / ratio.grad)
+        step_down[ratio.grad == 0] = -np.inf
+        step_up[ratio.grad == 0] = np.inf
+
+    value, gradient, elasticity = {}, {}, {}
+    for key in outputs:
+        result = results[key]
+        value[key] = result.value
+        gradient[key] = {name: result.grad[:, j] for j, name in enumerate(parameters)}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            elasticity[key] = {name: result.grad[:, j] * p[name].value / result.value for j, name in enumerate(parameters)}
+    layer_step = {name: (step_down[:, j], step_up[:, j]) for j, name in enumerate(parameters)}
+
+    sensitivity = {'value': value, 'gradient': gradient, 'elasticity': elasticity, 'layer_step': layer_step}
+    if columns is None:
+        # single point, return floats
+        sensitivity = _to_float(sensitivity)
+    return sensitivity
+
+
+def _to_float(tree):
+    if isinstance(tree, dict):
+        return {key: _to_float(value) for key, value in tree.items()}
+    if isinstance(tree, tuple):
+        return tuple(_to_float(value) for value in tree)
+    return float(tree[0])
+
+
+def _scale(unit, bounds):
+    # map [0, 1] samples to the parameter bounds
+    return {name: low + unit[..., j] * (high - low) for j, (name, (low, high)) in enumerate(bounds.items())}
+
+
+def morris_screening(model, battery_type, bounds, outputs=DEFAULT_OUTPUTS, trajectories=20, levels=4, seed=0):
+    # elementary effects on one-at-a-time trajectories, in units of the parameter range
+    # returns {output: {parameter: {'mu', 'mu_star', 'sigma'}}}
+    rng = np.random.default_rng(seed)
+    k = len(bounds)
+    delta = levels / (2 * (levels - 1))
+    direction = rng.choice([-1.0, 1.0], (trajectories, k))
+    start = rng.integers(0, levels // 2, (trajectories, k)) / (levels - 1) + delta * (direction < 0)
+    order = np.argsort(rng.random((trajectories, k)), axis=1)
+    rows = np.arange(trajectories)
+    points = np.empty((trajectories, k + 1, k))
+    points[:, 0] = start
+    for step in range(k):
+        points[:, step + 1] = points[:, step]
+        points[rows, step + 1, order[:, step]] += direction[rows, order[:, step]] * delta
+
+    values = evaluate_outputs(model.para, battery_type, _scale(points.reshape(-1, k), bounds), outputs)
+    names = list(bounds)
+    screening = {}
+    for key in outputs:
+        y = values[key].reshape(trajectories, k + 1)
+        effects = np.empty((trajectories, k))
+        effects[rows[:, None], order] = (y[:, 1:] - y[:, :-1]) / (direction[rows[:, None], order] * delta)
+        screening[key] = {name: {'mu': effects[:, j].mean(),
+                                 'mu_star': np.abs(effects[:, j]).mean(),
+                                 'sigma': effects[:, j].std(ddof=1)} for j, name in enumerate(names)}
+    return screening
+
+
+def sobol_indices(model, battery_type, bounds, outputs=DEFAULT_OUTPUTS, n_samples=4096, seed=0):
+    # first order (Saltelli 2010) and total order (Jansen) indices for parameters uniform within bounds
+    # all n_samples * (k + 2) model evaluations run in one batch
+    # returns {output: {'first_order': {parameter: S}, 'total_order': {parameter: ST}}}
+    rng = np.random.default_rng(seed)
+    k = len(bounds)
+    a = rng.random((n_samples, k))
+    b = rng.random((n_samples, k))
+    ab = np.repeat(a[None], k, axis=0)
+    for j in range(k):
+        ab[j, :, j] = b[:, j]
+    unit = np.concatenate([a, b, ab.reshape(-1, k)])
+
+    values = evaluate_outputs(model.para, battery_type, _scale(unit, bounds), outputs)
+    names = list(bounds)
+    indices = {}
+    for key in outputs:
+        y = values[key]
+        f_a, f_b = y[:n_samples], y[n_samples:2 * n_samples]
+        f_ab = y[2 * n_samples:].reshape(k, n_samples)
+        variance = np.concatenate([f_a, f_b]).var()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first = (f_b * (f_ab - f_a)).mean(axis=1) / variance
+            total = 0.5 * ((f_a - f_ab) ** 2).mean(axis=1) / variance
+        indices[key] = {'first_order': dict(zip(names, first)), 'total_order': dict(zip(names, total))}
+    return indices
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import os
+import time
+
+import numpy as np
+
+from ASSB_batch_model import MANUFACTURING_KEYS, POUCH_CELL_KEYS, calculate_pouch_cell_batch, manufacturing_energy_batch
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import battery_family, parameter_names, validate_values
+
+## Local evaluation server: scenario models stay loaded, concurrent single-point requests are coalesced into
+## batch evaluations (stdlib asyncio HTTP, TCP or Unix socket)
+##   python ASSB_server.py --port 8750                                   # the three shipped scenarios
+##   python ASSB_server.py --unix /tmp/assb.sock --scenario mine=my_parameters.yml
+## requests:
+##   POST /evaluate  {"scenario": "baseline", "battery_type": "ASSB_NMC811",
+##                    "parameters": {"mass_loading_cathode": 20}, "outputs": ["Specific_energy"]}
+##                   -> {"results": {"Specific_energy": ...}}, parameters and outputs are optional,
+##                      the results are those of calculate_pouch_cell and manufacturing_energy
+##   GET /metrics    throughput, queue depth, batch sizes and latency
+##   GET /health
+## a batch is started when the first request arrives and closed after window seconds or max_batch_size requests
+
+DEFAULT_SCENARIOS = {
+    'baseline': 'ASSB_baseline_performance_parameters.yml',
+    'optimal': 'ASSB_optimal_performance_parameters.yml',
+    'highest': 'ASSB_highest_performance_parameters.yml',
+}
+
+MAX_BODY_SIZE = 1 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+class RequestError(Exception):
+    # invalid request, answered with status 400
+    pass
+
+
+class MicroBatcher:
+    # queue of single-point requests evaluated together, models: {scenario name: BatteryModel}
+    def __init__(self, models, window=0.002, max_batch_size=4096):
+        self.models = models
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.queue = asyncio.Queue()
+        # one evaluation thread, the event loop keeps accepting requests during an evaluation
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {}       # power of two bucket -> number of batches
+        self.max_batch = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def check(self, request):
+        # validate a request, returns (scenario, battery type, parameters, outputs)
+        if not isinstance(request, dict):
+            raise RequestError("The request must be a JSON object.")
+        scenario = request.get('scenario', next(iter(self.models)))
+        if not isinstance(scenario, str) or scenario not in self.models:
+            raise RequestError(f"Unknown scenario '{scenario}'.")
+        model = self.models[scenario]
+        battery_type = request.get('battery_type')
+        if not isinstance(battery_type, str) or battery_type not in model.records:
+            raise RequestError(f"Unknown battery type '{battery_type}'.")
+        parameters = request.get('parameters') or {}
+        if not isinstance(parameters, dict):
+            raise RequestError("'parameters' must be an object of flat parameter names and values.")
+        names = parameter_names(battery_type)
+        for name in parameters:
+            if name not in names:
+                raise RequestError(f"Unknown parameter '{name}' for battery type '{battery_type}'.")
+        try:
+            validate_values(model.parameters(battery_type), parameters)
+        except ValueError as error:
+            raise RequestError(str(error)) from None
+        available = POUCH_CELL_KEYS[battery_family(battery_type)] + MANUFACTURING_KEYS
+        outputs = request.get('outputs')
+        if outputs is not None and not isinstance(outputs, list):
+            raise RequestError("'outputs' must be a list of output names.")
+        outputs = outputs or available      # all outputs by default
+        for key in outputs:
+            if not isinstance(key, str) or key not in available:
+                raise RequestError(f"Unknown output '{key}' for battery type '{battery_type}'.")
+        return scenario, battery_type, parameters, list(outputs)
+
+    async def submit(self, request):
+        # evaluate one request in the next batch, returns {output: value}
+        item = self.check(request)
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future, time.monotonic()))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # take everything that is already waiting
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.evaluate, [item for item, future, start in batch])
+            except Exception as error:     # answer the waiting requests instead of stopping the server
+                results = [error] * len(batch)
+            finished = time.monotonic()
+            for (item, future, start), result in zip(batch, results):
+                if future.done():   # the client went away
+                    continue
+                if isinstance(result, Exception):
+                    self.errors += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                latency = finished - start
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+            self.requests += len(batch)
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            bucket = 1 << (len(batch) - 1).bit_length()
+            self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+
+    def evaluate(self, items):
+        # one batch evaluation per scenario, returns the results in the order of items
+        results = [None] * len(items)
+        scenarios = {}
+        for i, item in enumerate(items):
+            scenarios.setdefault(item[0], []).append(i)
+        for scenario, rows in scenarios.items():
+            model = self.models[scenario]
+            types = np.array([items[i][1] for i in rows])
+            names = dict.fromkeys(name for i in rows for name in items[i][2])
+            columns = {}
+            for name in names:
+                # rows that do not set a parameter keep the scenario value of their battery type
+                columns[name] = np.array([items[i][2].get(name, getattr(model.parameters(items[i][1]), name, np.nan))
+                                          for i in rows], dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = calculate_pouch_cell_batch(model.para, types, columns)
+                values.update(manufacturing_energy_batch(model.para, types, columns, cell_capacity=values['Cell_capacity']))
+            for row, i in enumerate(rows):
+                results[i] = {key: float(values[key][row]) for key in items[i][3]}
+        return results
+
+    def metrics(self):
+        uptime = time.monotonic() - self.started
+        answered = max(self.requests, 1)
+        return {
+            'uptime': uptime,
+            'requests': self.requests,
+            'errors': self.errors,
+            'throughput': self.requests / uptime if uptime > 0 else 0.0,    # requests per second
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'batch_size': {
+                'mean': self.requests / self.batches if self.batches else 0.0,
+                'max': self.max_batch,
+                'histogram': {f'<={bucket}': count for bucket, count in sorted(self.batch_sizes.items())},
+            },
+            'latency_ms': {'mean': self.latency_total / answered * 1e3, 'max': self.latency_max * 1e3},
+        }
+
+
+class EvaluationServer:
+    # scenarios: {name: yaml path}, the models are loaded once at start
+    def __init__(self, scenarios=None, window=0.002, max_batch_size=4096):
+        if scenarios is None:
+            directory = os.path.dirname(os.path.abspath(__file__))
+            scenarios = {name: os.path.join(directory, path) for name, path in DEFAULT_SCENARIOS.items()}
+        self.models = {name: BatteryModel(path) for name, path in scenarios.items()}
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batcher = None
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line."}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length."}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {'error': "Request body too large."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        if target == '/evaluate':
+            if method != 'POST':
+                return 405, {'error': "Use POST."}
+            try:
+                request = json.loads(body or b'null')
+                return 200, {'results': await self.batcher.submit(request)}
+            except (ValueError, RequestError) as error:     # json.JSONDecodeError is a ValueError
+                self.batcher.errors += 1
+                return 400, {'error': str(error)}
+        if target in ('/metrics', '/health'):
+            if method != 'GET':
+                return 405, {'error': "Use GET."}
+            if target == '/health':
+                return 200, {'status': 'ok', 'scenarios': list(self.models)}
+            return 200, self.batcher.metrics()
+        return 404, {'error': f"Unknown path '{target}'."}
+
+    async def serve(self, host='127.0.0.1', port=8750, unix_path=None, ready=None):
+        # serve until cancelled; ready: optional asyncio.Event set once the socket listens
+        self.batcher = MicroBatcher(self.models, self.window, self.max_batch_size)
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        batching = asyncio.ensure_future(self.batcher.run())
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batching.cancel()
+            self.batcher.executor.shutdown(wait=False)
+
+
+def request(path, payload=None, host='127.0.0.1', port=8750, timeout=30):
+    # small client: GET path without payload, POST the JSON payload otherwise; returns the decoded response
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        if payload is None:
+            connection.request('GET', path)
+        else:
+            connection.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(data.get('error', f"HTTP {response.status}"))
+        return data
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local micro-batching evaluation server of the ASSB dimensioning model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8750)
+    parser.add_argument('--unix', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--scenario', action='append', metavar='NAME=PATH',
+                        help="scenario yaml to serve (repeatable), default: the three shipped scenarios")
+    parser.add_argument('--window', type=float, default=0.002, help="seconds a batch waits for more requests")
+    parser.add_argument('--max-batch-size', type=int, default=4096)
+    args = parser.parse_args(argv)
+    scenarios = None
+    if args.scenario:
+        scenarios = dict(entry.split('=', 1) for entry in args.scenario)
+    server = EvaluationServer(scenarios, args.window, args.max_batch_size)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import concurrent.futures
+import itertools
+import json
+import os
+
+import numpy as np
+
+from ASSB_batch_model import (BATCH_POUCH_CELL_KEYS, MANUFACTURING_KEYS, calculate_pouch_cell_batch,
+                              manufacturing_energy_batch, percentage_composition_batch)
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import PARAMETERS, parameter_names, validate_values
+from ASSB_result_store import RESULT_COLUMNS, ResultStore
+from ASSB_scenarios import scenario_hash
+
+## Sweep over the cartesian product scenario yaml x battery type x override grid
+## the rows are split into chunks of consecutive indices, each chunk is evaluated with the batch model in a worker process
+## every worker builds the BatteryModel of each scenario once, a task only carries (start, stop)
+## finished chunks can be written to a checkpoint directory, a restarted sweep skips them
+
+BATTERY_TYPES = ('LIB_LFP', 'LIB_NMC811', 'ASSB_LFP', 'ASSB_NMC811')
+RESULT_KEYS = BATCH_POUCH_CELL_KEYS + MANUFACTURING_KEYS
+
+_worker = {}
+
+
+def _init_worker(scenario_paths, battery_types, overrides):
+    _worker['models'] = [BatteryModel(path) for path in scenario_paths]
+    _worker['battery_types'] = np.array(battery_types)
+    _worker['overrides'] = {name: np.asarray(values, dtype=float) for name, values in overrides.items()}
+
+
+def _evaluate_rows(start, stop):
+    models = _worker['models']
+    battery_types = _worker['battery_types']
+    overrides = _worker['overrides']
+    shape = (len(models), len(battery_types)) + tuple(len(values) for values in overrides.values())
+    index = np.unravel_index(np.arange(start, stop), shape)
+    scenario, types = index[0], battery_types[index[1]]
+    columns = {name: values[i] for (name, values), i in zip(overrides.items(), index[2:])}
+
+    results = {key: np.full(stop - start, np.nan) for key in RESULT_KEYS}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for s, model in enumerate(models):
+            rows = np.flatnonzero(scenario == s)
+            if len(rows) == 0:
+                continue
+            subset = {name: values[rows] for name, values in columns.items()}
+            pouch = calculate_pouch_cell_batch(model.para, types[rows], subset)
+            energy = manufacturing_energy_batch(model.para, types[rows], subset, cell_capacity=pouch['Cell_capacity'])
+            for key, values in itertools.chain(pouch.items(), energy.items()):
+                results[key][rows] = values
+    results['scenario'] = scenario
+    results['battery_type'] = index[1]
+    results.update(columns)
+    return results
+
+
+class SweepRunner:
+    # scenario_paths: parameter yaml files, battery_types: keys of the battery_type section
+    # overrides: dict of flat parameter name (see ASSB_parameters) -> list of values, swept as a cartesian grid
+    def __init__(self, scenario_paths, battery_types=BATTERY_TYPES, overrides=None, chunk_size=10000,
+                 max_workers=None, checkpoint_dir=None):
+        self.scenario_paths = [os.path.abspath(path) for path in scenario_paths]
+        self.battery_types = list(battery_types)
+        overrides = {name: list(values) for name, values in (overrides or {}).items()}
+        self._check_overrides(overrides)
+        self.overrides = {name: [float(value) for value in values] for name, values in overrides.items()}
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count()
+        self.checkpoint_dir = checkpoint_dir
+
+    def _check_overrides(self, overrides):
+        # every override value must be valid for each scenario and battery type that uses the parameter
+        for name in overrides:
+            if name not in PARAMETERS:
+                raise KeyError(f"Unknown parameter '{name}'.")
+            if not any(name in parameter_names(bt) for bt in self.battery_types):
+                raise KeyError(f"Parameter '{name}' is not used by the battery types {self.battery_types}.")
+        for path in self.scenario_paths:
+            model = BatteryModel(path)
+            for bt in self.battery_types:
+                record = model.parameters(bt)
+                names = parameter_names(bt)
+                for name, values in overrides.items():
+                    if name not in names:
+                        continue
+                    for value in values:
+                        try:
+                            validate_values(record, {name: value})
+                        except ValueError as error:
+                            raise ValueError(f"Override of '{name}' for {bt} in '{path}': {error}") from None
+
+    def __len__(self):
+        size = len(self.scenario_paths) * len(self.battery_types)
+        for values in self.overrides.values():
+            size *= len(values)
+        return size
+
+    @property
+    def n_chunks(self):
+        return -(-len(self) // self.chunk_size)
+
+    def _definition(self):
+        return {
+            'scenarios': [[path, scenario_hash(path)] for path in self.scenario_paths],
+            'battery_types': self.battery_types,
+            'overrides': self.overrides,
+            'chunk_size': self.chunk_size,
+        }
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.checkpoint_dir, f'chunk_{chunk:06d}.npz')
+
+    def _prepare_checkpoint(self):
+        # the checkpoint directory belongs to exactly one sweep definition
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        manifest = os.path.join(self.checkpoint_dir, 'sweep.json')
+        definition = self._definition()
+        if os.path.exists(manifest):
+            with open(manifest, 'r') as file:
+                if json.load(file) != definition:
+                    raise ValueError(f"Checkpoint directory '{self.checkpoint_dir}' belongs to a different sweep.")
+        else:
+            with open(manifest, 'w') as file:
+                json.dump(definition, file, indent=1)
+
+    def _load_chunk(self, chunk):
+        with np.load(self._chunk_path(chunk)) as data:
+            return {key: data[key] for key in data.files}
+
+    def _save_chunk(self, chunk, results):
+        path = self._chunk_path(chunk)
+        with open(path + '.tmp', 'wb') as file:
+            np.savez(file, **results)
+        os.replace(path + '.tmp', path)
+
+    def iter_chunks(self, first_chunk=0):
+        # yield (chunk index, results) in input order, results is a dict of arrays
+        # with the output keys plus the 'scenario' and 'battery_type' indices and the override values of each row
+        # chunks before first_chunk are neither evaluated nor yielded
+        done = set()
+        if self.checkpoint_dir is not None:
+            self._prepare_checkpoint()
+            done = {chunk for chunk in range(first_chunk, self.n_chunks) if os.path.exists(self._chunk_path(chunk))}
+        todo = iter([chunk for chunk in range(first_chunk, self.n_chunks) if chunk not in done])
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker,
+                initargs=(self.scenario_paths, self.battery_types, self.overrides)) as executor:
+            pending = {}
+            try:
+                # keep a bounded number of chunks in flight so memory stays flat on long sweeps
+                for chunk in itertools.islice(todo, 2 * self.max_workers):
+                    pending[chunk] = executor.submit(_evaluate_rows, *self._rows(chunk))
+                for chunk in range(first_chunk, self.n_chunks):
+                    if chunk in done:
+                        yield chunk, self._load_chunk(chunk)
+                        continue
+                    results = pending.pop(chunk).result()
+                    if self.checkpoint_dir is not None:
+                        self._save_chunk(chunk, results)
+                    following = next(todo, None)
+                    if following is not None:
+                        pending[following] = executor.submit(_evaluate_rows, *self._rows(following))
+                    yield chunk, results
+            finally:
+                # the consumer stopped early, do not wait for chunks that have not started
+                for future in pending.values():
+                    future.cancel()
+
+    def _rows(self, chunk):
+        return chunk * self.chunk_size, min((chunk + 1) * self.chunk_size, len(self))
+
+    def run(self, store=None):
+        # evaluate the whole sweep and return the concatenated columns
+        # with store (a directory), the chunks are written to a ResultStore instead, which is returned;
+        # a store of an interrupted run of the same sweep is continued after its last complete chunk
+        if store is not None:
+            return self._run_to_store(store)
+        chunks = [results for chunk, results in self.iter_chunks()]
+        if not chunks:
+            return {}
+        return {key: np.concatenate([results[key] for results in chunks]) for key in chunks[0]}
+
+    def _run_to_store(self, path):
+        columns = {'scenario': 'int64', 'battery_type': 'category'}
+        columns.update(dict.fromkeys(self.overrides, 'float64'))
+        columns.update(dict.fromkeys(RESULT_COLUMNS, 'float64'))
+        definition = json.loads(json.dumps(self._definition()))
+        store = ResultStore(path, columns, chunk_size=self.chunk_size, metadata=definition)
+        if store.metadata != definition:
+            raise ValueError(f"Result store '{path}' belongs to a different sweep.")
+        # the chunks are flushed one by one, a partly written one is dropped and evaluated again
+        first_chunk = len(store) // self.chunk_size
+        store.truncate(first_chunk * self.chunk_size)
+        battery_types = np.array(self.battery_types)
+        for chunk, results in self.iter_chunks(first_chunk):
+            results = dict(results, battery_type=battery_types[results['battery_type']])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentages = percentage_composition_batch(results)
+            results.update((f'{key}_percentage', values) for key, values in percentages.items())
+            store.append(results)
+            store.flush()
+        store.close()
+        return store
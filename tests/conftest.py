@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+## the modules are flat files in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ASSB_scenarios
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_server import DEFAULT_SCENARIOS
+
+## the test run keeps the scenario cache in memory, tests of the disk cache set their own directory
+ASSB_scenarios.CACHE_DIR = None
+
+
+@pytest.fixture(scope='session')
+def scenario_paths():
+    # {scenario name: path} of the shipped scenario files
+    return {name: os.path.join(ROOT, path) for name, path in DEFAULT_SCENARIOS.items()}
+
+
+@pytest.fixture(scope='module')
+def models(scenario_paths):
+    return {name: BatteryModel(path) for name, path in scenario_paths.items()}
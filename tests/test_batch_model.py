@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from ASSB_batch_model import calculate_pouch_cell_batch, manufacturing_energy_batch, percentage_composition_batch
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import parameter_update
+from ASSB_server import DEFAULT_SCENARIOS
+from ASSB_sweep import BATTERY_TYPES
+
+## the scalar methods of BatteryModel are the reference, the batch path must give the same numbers for every
+## shipped scenario and battery type
+
+SCENARIOS = tuple(DEFAULT_SCENARIOS)
+CASES = [(scenario, bt) for scenario in SCENARIOS for bt in BATTERY_TYPES]
+
+
+def scalar_results(model, battery_type):
+    results = dict(model.calculate_pouch_cell(battery_type))
+    results.update(model.manufacturing_energy(battery_type))
+    return results
+
+
+def assert_same(expected, actual):
+    for key, value in expected.items():
+        assert float(actual[key]) == pytest.approx(value, rel=1e-12, abs=1e-12), key
+
+
+@pytest.mark.parametrize('scenario, battery_type', CASES)
+def test_batch(models, scenario, battery_type):
+    model = models[scenario]
+    results = calculate_pouch_cell_batch(model.para, battery_type)
+    results.update(manufacturing_energy_batch(model.para, battery_type, cell_capacity=results['Cell_capacity']))
+    assert_same(scalar_results(model, battery_type), {key: values[0] for key, values in results.items()})
+    percentages = percentage_composition_batch(results)
+    assert_same(model.calculate_percentage_composition(battery_type), {key: values[0] for key, values in percentages.items()})
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS)
+def test_batch_columns(scenario_paths, scenario):
+    # rows of mixed battery types with their own parameter values, each row equals a scalar model with those values
+    model = BatteryModel(scenario_paths[scenario])
+    rng = np.random.default_rng(1)
+    types = np.resize(np.array(BATTERY_TYPES), 12)
+    columns = {'mass_loading_cathode': rng.uniform(5, 30, 12), 'porosity_cathode': rng.uniform(0.1, 0.4, 12),
+               'assembly_gas': rng.uniform(0, 1, 12)}
+    results = calculate_pouch_cell_batch(model.para, types, columns)
+    results.update(manufacturing_energy_batch(model.para, types, columns, cell_capacity=results['Cell_capacity']))
+    for row, bt in enumerate(types):
+        reference = BatteryModel(scenario_paths[scenario])
+        reference.update_parameters(parameter_update({name: values[row] for name, values in columns.items()}, bt))
+        assert_same(scalar_results(reference, bt), {key: values[row] for key, values in results.items()})
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from ASSB_batch_model import calculate_pouch_cell_batch, manufacturing_energy_batch
+from ASSB_server import DEFAULT_SCENARIOS
+from ASSB_sweep import BATTERY_TYPES
+
+CASES = [(scenario, bt) for scenario in DEFAULT_SCENARIOS for bt in BATTERY_TYPES]
+FREE = ['mass_loading_cathode', 'porosity_cathode']
+
+
+def assert_same(expected, actual):
+    for key, value in expected.items():
+        assert float(actual[key]) == pytest.approx(value, rel=1e-12, abs=1e-12), key
+
+
+@pytest.mark.parametrize('scenario, battery_type', CASES)
+def test_compiled(models, scenario, battery_type):
+    model = models[scenario]
+    parameters = model.parameters(battery_type)
+    evaluate = model.compile(battery_type, FREE)
+    expected = dict(model.calculate_pouch_cell(battery_type))
+    expected.update(model.manufacturing_energy(battery_type))
+    assert_same(expected, evaluate(*(getattr(parameters, name) for name in FREE)))
+
+
+@pytest.mark.parametrize('battery_type', BATTERY_TYPES)
+def test_vectorized(models, battery_type):
+    model = models['optimal']
+    columns = {'mass_loading_cathode': np.linspace(8, 30, 7), 'porosity_cathode': np.linspace(0.35, 0.15, 7)}
+    results = model.compile(battery_type, FREE, vectorized=True)(*columns.values())
+    expected = calculate_pouch_cell_batch(model.para, battery_type, columns)
+    expected.update(manufacturing_energy_batch(model.para, battery_type, columns, cell_capacity=expected['Cell_capacity']))
+    for key, values in results.items():
+        np.testing.assert_allclose(values, expected[key], rtol=1e-12)
+
+
+def test_selected_outputs(models):
+    evaluate = models['baseline'].compile('ASSB_LFP', ['electrolyte_thickness'], outputs=['Specific_energy'])
+    assert list(evaluate(0.05)) == ['Specific_energy']
+    assert 'Total_mass' not in evaluate.source
+
+
+def test_unknown_names(models):
+    with pytest.raises(KeyError):
+        models['baseline'].compile('ASSB_LFP', ['separator_thickness'])     # LIB only
+    with pytest.raises(KeyError):
+        models['baseline'].compile('ASSB_LFP', FREE, outputs=['Unknown'])
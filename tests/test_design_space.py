@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from ASSB_design_space import DesignSpaceExplorer, ParetoArchive, non_dominated
+
+SPACE = {'cathode_width': [50.0, 60.0, 70.0], 'cathode_length': [80.0, 90.0], 'mass_loading_cathode': (8.0, 30.0)}
+
+
+def derive(columns):
+    # the anode, electrolyte and current collector 2 mm larger than the cathode
+    extra = {}
+    for part in ('anode', 'electrolyte', 'current_collector'):
+        extra[f'{part}_width'] = columns['cathode_width'] + 2
+        extra[f'{part}_length'] = columns['cathode_length'] + 2
+    return extra
+
+
+def test_non_dominated():
+    # maximized, duplicates kept once, blocks of two points for three objectives
+    points = np.array([[1, 1, 0], [0, 2, 0], [2, 0, 0], [0.5, 0.5, 0], [1, 1, 0], [0, 0, 1]], dtype=float)
+    keep = non_dominated(points, block_size=2)
+    assert sorted(tuple(point) for point in points[keep].tolist()) == [(0, 0, 1), (0, 2, 0), (1, 1, 0), (2, 0, 0)]
+    keep = non_dominated(points[:, :2])
+    assert sorted(tuple(point) for point in points[keep, :2].tolist()) == [(0, 2), (1, 1), (2, 0)]
+
+
+def test_archive_accumulates():
+    archive = ParetoArchive({'a': 'max', 'b': 'min'})
+    archive.add({'a': np.array([1.0, 2.0]), 'b': np.array([1.0, 3.0])}, {'x': np.array([0.0, 1.0])})
+    archive.add({'a': np.array([2.0]), 'b': np.array([1.0])}, {'x': np.array([2.0])})
+    assert archive.front() == {'x': pytest.approx([2.0]), 'a': pytest.approx([2.0]), 'b': pytest.approx([1.0])}
+
+
+def test_front_is_non_dominated(models):
+    explorer = DesignSpaceExplorer(models['baseline'], 'ASSB_NMC811', SPACE, derive=derive, chunk_size=500)
+    front = explorer.explore(2000)
+    stats = explorer.stats()
+    assert stats['evaluated'] + stats['infeasible_geometry'] == 2000
+    assert stats['front_size'] == len(front['Specific_energy']) > 1
+    # no front design dominates another
+    points = np.column_stack([front['Specific_energy'], front['Energy_density'], -front['one_cell_man_energy'],
+                              -front['Total_mass']])
+    assert len(non_dominated(points)) == len(points)
+
+
+def test_grid(models):
+    space = {'cathode_width': [50.0, 60.0], 'cathode_length': [80.0], 'mass_loading_cathode': [10.0, 20.0, 30.0]}
+    explorer = DesignSpaceExplorer(models['baseline'], 'LIB_LFP', space, derive=derive)
+    explorer.explore()
+    assert explorer.stats()['evaluated'] + explorer.stats()['infeasible_geometry'] == 6
+    with pytest.raises(ValueError):
+        DesignSpaceExplorer(models['baseline'], 'LIB_LFP', SPACE).explore()     # a sampled axis
+
+
+def test_unknown_axes(models):
+    with pytest.raises(KeyError):
+        DesignSpaceExplorer(models['baseline'], 'ASSB_LFP', {'separator_thickness': (0.01, 0.02)})     # LIB only
+    with pytest.raises(KeyError):
+        DesignSpaceExplorer(models['baseline'], 'ASSB_LFP', {'unknown': (0, 1)})
+    explorer = DesignSpaceExplorer(models['baseline'], 'ASSB_LFP', SPACE,
+                                   derive=lambda columns: {'separator_thickness': columns['cathode_width'] * 0})
+    with pytest.raises(KeyError):
+        explorer.explore(10)
@@ -0,0 +1,75 @@
+import pytest
+
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import parameter_update
+from ASSB_sweep import BATTERY_TYPES
+
+
+@pytest.mark.parametrize('battery_type', BATTERY_TYPES)
+def test_keyword_arguments(scenario_paths, battery_type):
+    model = BatteryModel(scenario_paths['baseline'])
+    positional = model.calculate_pouch_cell(battery_type)
+    hits = model.cache_hits
+    assert model.calculate_pouch_cell(battery_type=battery_type) == positional
+    assert model.cache_hits == hits + 1     # the same cache entry
+    assert model.manufacturing_energy(battery_type=battery_type) == model.manufacturing_energy(battery_type)
+    assert model.calculate_percentage_composition(battery_type=battery_type) == \
+        model.calculate_percentage_composition(battery_type)
+
+
+def test_repeated_calls_are_cached(scenario_paths):
+    model = BatteryModel(scenario_paths['baseline'])
+    first = model.calculate_pouch_cell('LIB_NMC811')
+    misses = model.cache_misses
+    first['Total_mass'] = 0.0     # the returned dict is a copy
+    second = model.calculate_pouch_cell('LIB_NMC811')
+    assert model.cache_misses == misses
+    assert second['Total_mass'] > 0
+
+
+def test_update_drops_only_dependent_entries(scenario_paths):
+    model = BatteryModel(scenario_paths['baseline'])
+    for bt in BATTERY_TYPES:
+        model.calculate_pouch_cell(bt)
+    model.manufacturing_energy('ASSB_LFP')
+
+    # the container thickness changes neither the component areas nor the coatings
+    model.update_parameters({'thicknesses': {'cell_container_thickness': 0.12}})
+    assert ('calculate_component_areas',) in model._cache
+    assert ('calculate_LIBanode_thickness_single_layer', 'LIB_LFP') in model._cache
+    assert ('calculate_pouch_cell', 'ASSB_LFP') not in model._cache
+
+    # an indexed parameter only drops the entries of its battery type
+    model.calculate_pouch_cell('ASSB_LFP')
+    model.update_parameters(parameter_update({'mass_loading_cathode': 12.0}, 'LIB_LFP'))
+    assert ('calculate_pouch_cell', 'LIB_LFP') not in model._cache
+    assert ('calculate_pouch_cell', 'ASSB_LFP') in model._cache
+
+    model.update_parameters({'dimensions': {'cathode': {'width': 60}}})
+    assert ('calculate_component_areas',) not in model._cache
+
+
+@pytest.mark.parametrize('battery_type', BATTERY_TYPES)
+def test_updated_results_equal_a_fresh_model(scenario_paths, battery_type):
+    updates = {'mass_loading_cathode': 18.0, 'porosity_cathode': 0.3, 'cell_container_thickness': 0.12}
+    model = BatteryModel(scenario_paths['baseline'])
+    model.calculate_pouch_cell(battery_type)
+    model.manufacturing_energy(battery_type)
+    model.update_parameters(parameter_update(updates, battery_type))
+
+    # updated before anything is cached
+    fresh = BatteryModel(scenario_paths['baseline'])
+    fresh.update_parameters(parameter_update(updates, battery_type))
+    assert model.calculate_pouch_cell(battery_type) == fresh.calculate_pouch_cell(battery_type)
+    assert model.manufacturing_energy(battery_type) == fresh.manufacturing_energy(battery_type)
+
+
+def test_invalidate_cache_after_direct_edits(scenario_paths):
+    model = BatteryModel(scenario_paths['baseline'])
+    before = model.calculate_pouch_cell('ASSB_NMC811')['Specific_energy']
+    model.dimensions['cathode']['width'] = 60
+    model.invalidate_cache()
+    after = model.calculate_pouch_cell('ASSB_NMC811')['Specific_energy']
+    batch = model.calculate_pouch_cell_batch('ASSB_NMC811')['Specific_energy'][0]
+    assert after != before
+    assert after == pytest.approx(batch, rel=1e-12)
@@ -0,0 +1,41 @@
+import pytest
+
+from ASSB_dimensioning_model import BatteryModel
+
+
+@pytest.fixture
+def model(scenario_paths):
+    return BatteryModel(scenario_paths['baseline'])
+
+
+def test_single_target(model):
+    result = model.inverse_design('ASSB_NMC811', {'Specific_energy': 300}, {'mass_loading_cathode': (5, 40)},
+                                  apply=True)
+    assert result['converged']
+    assert result['achieved']['Specific_energy'] == pytest.approx(300, rel=1e-6)
+    # applied to the model, the scalar path gives the same result
+    assert model.parameters('ASSB_NMC811').mass_loading_cathode == result['parameters']['mass_loading_cathode']
+    assert model.calculate_pouch_cell('ASSB_NMC811')['Specific_energy'] == pytest.approx(300, rel=1e-6)
+
+
+def test_two_targets(model, scenario_paths):
+    # targets of a known design are reachable
+    known = BatteryModel(scenario_paths['baseline'])
+    known.update_parameters({'material_properties': {'mass_loading': {'cathode': {'LIB_NMC811': 20.0}},
+                                                     'porosity_cathode': 0.3}})
+    outputs = known.calculate_pouch_cell('LIB_NMC811')
+    targets = {'Specific_energy': outputs['Specific_energy'], 'Energy_density': outputs['Energy_density']}
+    result = model.inverse_design('LIB_NMC811', targets, {'mass_loading_cathode': (5, 40), 'porosity_cathode': (0.1, 0.5)})
+    assert result['converged']
+    for key, target in targets.items():
+        assert result['achieved'][key] == pytest.approx(target, rel=1e-6)
+
+
+def test_unknown_names(model):
+    para = model.para
+    with pytest.raises(KeyError):
+        # ASSB only, would not change the outputs of LIB_LFP
+        model.inverse_design('LIB_LFP', {'Specific_energy': 250}, {'electrolyte_thickness': (0.01, 0.1)}, apply=True)
+    assert 'LIB_LFP' not in para['thicknesses']['electrolyte']
+    with pytest.raises(KeyError):
+        model.inverse_design('LIB_LFP', {'Unknown': 1}, {'mass_loading_cathode': (5, 40)})
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_monte_carlo import MonteCarlo, ParameterSampler, RunningMoments, TDigest
+
+SPEC = {
+    'seed': 7,
+    'parameters': {
+        'mass_loading_cathode': {'distribution': 'normal', 'std': 1.5},
+        'porosity_cathode': {'distribution': 'triangular', 'low': 0.2, 'high': 0.35},
+        'separator_thickness': {'distribution': 'uniform', 'low': 0.01, 'high': 0.02},     # LIB only
+        'electrolyte_thickness': {
+            'ASSB_NMC811': {'distribution': 'lognormal', 'sigma': 0.1},
+        },
+    },
+    'correlations': [['mass_loading_cathode', 'porosity_cathode', 0.5]],
+}
+
+
+@pytest.fixture
+def model(scenario_paths):
+    return BatteryModel(scenario_paths['baseline'])
+
+
+def assert_same_summary(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, summary in expected.items():
+        edges, counts = summary.pop('histogram')
+        actual_edges, actual_counts = actual[key].pop('histogram')
+        np.testing.assert_array_equal(edges, actual_edges)
+        np.testing.assert_array_equal(counts, actual_counts)
+        assert summary == actual[key], key
+
+
+def test_sampler(model):
+    sampler = ParameterSampler(model.para, 'ASSB_NMC811', SPEC)
+    assert list(sampler.distributions) == ['mass_loading_cathode', 'porosity_cathode', 'electrolyte_thickness']
+    columns = sampler.sample(np.random.default_rng(0), 20000)
+    nominal = model.parameters('ASSB_NMC811')
+    assert columns['mass_loading_cathode'].mean() == pytest.approx(nominal.mass_loading_cathode, rel=0.01)
+    assert np.median(columns['electrolyte_thickness']) == pytest.approx(nominal.electrolyte_thickness, rel=0.01)
+    assert columns['porosity_cathode'].min() >= 0.2 and columns['porosity_cathode'].max() <= 0.35
+    rho = np.corrcoef(columns['mass_loading_cathode'], columns['porosity_cathode'])[0, 1]
+    assert rho == pytest.approx(0.5, abs=0.05)
+    assert 'separator_thickness' in ParameterSampler(model.para, 'LIB_LFP', SPEC).distributions
+
+
+def test_sampler_errors(model):
+    with pytest.raises(KeyError):
+        ParameterSampler(model.para, 'ASSB_LFP', {'parameters': {'unknown': {'distribution': 'normal', 'std': 1}}})
+    with pytest.raises(ValueError, match='not used'):
+        ParameterSampler(model.para, 'ASSB_LFP',
+                         {'parameters': {'separator_thickness': {'ASSB_LFP': {'distribution': 'normal', 'std': 1}}}})
+    with pytest.raises(ValueError, match='missing'):
+        ParameterSampler(model.para, 'ASSB_LFP', {'parameters': {'porosity_cathode': {'distribution': 'uniform'}}})
+    with pytest.raises(ValueError, match='positive definite'):
+        spec = dict(SPEC, correlations=[['mass_loading_cathode', 'porosity_cathode', 1.5]])
+        ParameterSampler(model.para, 'ASSB_LFP', spec)
+
+
+def test_resume_gives_the_same_draws(model, tmp_path):
+    checkpoint = str(tmp_path / 'run.pickle')
+    straight = MonteCarlo(model, 'ASSB_NMC811', SPEC, chunk_size=300).run(1000)
+
+    # interrupted after a chunk: the statistics see the same updates
+    MonteCarlo(model, 'ASSB_NMC811', SPEC, chunk_size=300).run(600, checkpoint=checkpoint)
+    resumed = MonteCarlo.resume(model, checkpoint)
+    assert resumed.samples_done == 600
+    assert_same_summary(straight, resumed.run(1000))
+
+
+def test_resume_inside_a_chunk(model, tmp_path):
+    checkpoint = str(tmp_path / 'run.pickle')
+    straight = MonteCarlo(model, 'ASSB_NMC811', SPEC, chunk_size=300).run(1000)
+    MonteCarlo(model, 'ASSB_NMC811', SPEC, chunk_size=300).run(450, checkpoint=checkpoint)
+    resumed = MonteCarlo.resume(model, checkpoint).run(1000)
+    # the same samples, only the rounding of the running statistics differs
+    for key, summary in straight.items():
+        assert resumed[key]['count'] == summary['count']
+        assert (resumed[key]['min'], resumed[key]['max']) == (summary['min'], summary['max'])
+        assert resumed[key]['mean'] == pytest.approx(summary['mean'], rel=1e-12, nan_ok=True)
+
+
+def test_resume_with_other_parameters(model, tmp_path):
+    checkpoint = str(tmp_path / 'run.pickle')
+    MonteCarlo(model, 'ASSB_LFP', SPEC, chunk_size=100).run(100, checkpoint=checkpoint)
+    model.update_parameters({'material_properties': {'porosity_cathode': 0.31}})
+    with pytest.raises(ValueError):
+        MonteCarlo.resume(model, checkpoint)
+
+
+def test_streaming_statistics():
+    values = np.random.default_rng(3).normal(10, 2, 50000)
+    moments = RunningMoments()
+    digest = TDigest()
+    for block in np.array_split(values, 17):
+        moments.update(block)
+        digest.update(block)
+    assert moments.count == values.size
+    assert moments.mean == pytest.approx(values.mean())
+    assert moments.variance == pytest.approx(values.var(ddof=1))
+    for q in (0.05, 0.5, 0.95):
+        assert digest.quantile(q) == pytest.approx(np.quantile(values, q), abs=0.05)
@@ -0,0 +1,79 @@
+import copy
+
+import numpy as np
+import pytest
+
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import (PARAMETERS, SCHEMA, compile_parameters, get_parameter_values, parameter_names,
+                             parameter_update, validate_values)
+from ASSB_scenarios import load_scenario
+from ASSB_sweep import BATTERY_TYPES
+
+
+@pytest.fixture(scope='module')
+def para(scenario_paths):
+    return load_scenario(scenario_paths['baseline'])
+
+
+def test_schema_covers_parameters():
+    assert set(SCHEMA) == set(PARAMETERS)
+
+
+@pytest.mark.parametrize('battery_type', BATTERY_TYPES)
+def test_records(para, battery_type):
+    common, records = compile_parameters(para)
+    record = records[battery_type]
+    assert record.as_dict() == {name: float(value) for name, value in get_parameter_values(para, battery_type).items()}
+    for name in PARAMETERS:
+        if name not in parameter_names(battery_type):
+            assert getattr(record, name) is None
+
+
+def test_schema_errors(para):
+    para = copy.deepcopy(para)
+    para['material_properties']['porosity_cathode'] = 1.5
+    para['thicknesses']['electrolyte']['ASSB_LFP'] = 'thin'
+    para['material_properties']['ratio_cathode_bc'] = 0.5       # the ratios add up to more than 1
+    del para['dimensions']['cathode']['width']
+    with pytest.raises(ValueError) as error:
+        compile_parameters(para)
+    message = str(error.value)
+    for part in ('material_properties.porosity_cathode: 1.5', "thicknesses.electrolyte.ASSB_LFP: 'thin'",
+                 'add up to', 'dimensions.cathode.width: missing'):
+        assert part in message
+
+
+def test_rejected_update_leaves_the_model_unchanged(scenario_paths):
+    model = BatteryModel(scenario_paths['baseline'])
+    para = copy.deepcopy(model.para)
+    before = model.calculate_pouch_cell('LIB_LFP')
+    record = model.parameters('LIB_LFP').as_dict()
+    with pytest.raises(ValueError):
+        # the first value is valid, the second is not
+        model.update_parameters({'dimensions': {'cathode': {'width': 60}},
+                                 'material_properties': {'mass_loading': {'cathode': {'LIB_LFP': -1}}}})
+    assert model.para == para
+    assert model.parameters('LIB_LFP').as_dict() == record
+    assert model.calculate_pouch_cell('LIB_LFP') == before
+
+
+def test_numpy_values(scenario_paths):
+    model = BatteryModel(scenario_paths['baseline'])
+    model.update_parameters(parameter_update({'mass_loading_cathode': np.float32(12.5),
+                                              'cathode_width': np.int64(60)}, 'ASSB_LFP'))
+    record = model.parameters('ASSB_LFP')
+    assert type(record.mass_loading_cathode) is float and record.mass_loading_cathode == 12.5
+    assert type(record.cathode_width) is float and record.cathode_width == 60
+    validate_values(record, {'porosity_cathode': np.float64(0.3)})
+    for value in (np.bool_(True), True, 'x'):
+        with pytest.raises(ValueError):
+            validate_values(record, {'porosity_cathode': value})
+
+
+def test_validate_values(scenario_paths):
+    record = BatteryModel(scenario_paths['baseline']).parameters('ASSB_NMC811')
+    validate_values(record, {'mass_loading_cathode': 20})
+    with pytest.raises(ValueError, match='mass_loading_cathode'):
+        validate_values(record, {'mass_loading_cathode': 0})
+    with pytest.raises(ValueError, match='add up to'):
+        validate_values(record, {'ratio_cathode_active_material': 0.99})
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from ASSB_projection import MASS_KEYS, FleetProjection
+from ASSB_server import DEFAULT_SCENARIOS
+from ASSB_sweep import BATTERY_TYPES
+
+SCENARIOS = tuple(DEFAULT_SCENARIOS)
+
+
+@pytest.fixture(scope='module')
+def projection(models):
+    return FleetProjection(models)
+
+
+@pytest.mark.parametrize('battery_type', BATTERY_TYPES)
+def test_anchor_years(models, projection, battery_type):
+    # at the anchor years the projection evaluates exactly the anchor scenarios
+    years = [2025, 2030, 2035]
+    result = projection.project(years, {battery_type: 1.0}, {'steps': dict(zip(years, SCENARIOS))})
+    for y, scenario in enumerate(SCENARIOS):
+        expected = dict(models[scenario].calculate_pouch_cell(battery_type))
+        expected.update(models[scenario].manufacturing_energy(battery_type))
+        for key, value in expected.items():
+            assert float(result['per_cell'][key][0, y, 0]) == pytest.approx(value, rel=1e-12, abs=1e-12), key
+
+
+def test_interpolated_parameters(models, projection):
+    values = projection.parameters('ASSB_LFP', [0.0, 0.5, 1.0])['electrolyte_thickness']
+    baseline = models['baseline'].parameters('ASSB_LFP').electrolyte_thickness
+    optimal = models['optimal'].parameters('ASSB_LFP').electrolyte_thickness
+    np.testing.assert_allclose(values, [baseline, (baseline + optimal) / 2, optimal])
+
+
+def test_demand(projection):
+    years = np.arange(2025, 2031)
+    production = {'LIB_NMC811': {2026: 10.0, 2030: 50.0}}
+    result = projection.project(years, production, {'slow': {2025: 'baseline', 2030: 'optimal'}})
+    gwh = result['production'][0, :, 0]
+    np.testing.assert_allclose(gwh, [0, 10, 20, 30, 40, 50])    # 0 before the first production year
+    cells = result['cells'][0, :, 0]
+    np.testing.assert_allclose(cells[1:], gwh[1:] * 1e9 / result['per_cell']['Cell_capacity'][0, 1:, 0])
+    for key in MASS_KEYS:
+        np.testing.assert_allclose(result['materials'][key][0, :, 0], result['per_cell'][key][0, :, 0] * cells / 1e6)
+
+
+def test_unknown_names(projection):
+    with pytest.raises(KeyError):
+        projection.project([2025], {'NIB': 1.0}, {'a': {2025: 0}})
+    with pytest.raises(KeyError):
+        projection.project([2025], {'ASSB_LFP': 1.0}, {'a': {2025: 'unknown'}})
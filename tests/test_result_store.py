@@ -0,0 +1,137 @@
+import math
+
+import numpy as np
+import pytest
+
+from ASSB_result_store import RESULT_COLUMNS, ResultStore, result_row
+from ASSB_sweep import SweepRunner
+
+COLUMNS = {'battery_type': 'category', 'index': 'int64', 'value': 'float64'}
+
+
+def filled(path, rows=10, chunk_size=4):
+    store = ResultStore(str(path), COLUMNS, chunk_size=chunk_size, metadata={'note': 'test'})
+    types = np.array(['ASSB_LFP', 'LIB_LFP'])[np.arange(rows) % 2]
+    store.append({'battery_type': types, 'index': np.arange(rows), 'value': np.arange(rows) * 0.5})
+    store.close()
+    return store
+
+
+def test_append_and_reopen(tmp_path):
+    filled(tmp_path / 'store')
+    store = ResultStore(str(tmp_path / 'store'))
+    assert len(store) == 10
+    assert store.metadata == {'note': 'test'}
+    assert store.categories('battery_type') == ['ASSB_LFP', 'LIB_LFP']
+    np.testing.assert_array_equal(store.column('value'), np.arange(10) * 0.5)
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path / 'store'), {'value': 'float64'})
+
+
+def test_missing_float_columns_are_nan(tmp_path):
+    store = ResultStore(str(tmp_path / 'store'), COLUMNS)
+    store.append({'battery_type': 'ASSB_LFP', 'index': 1})
+    store.flush()
+    assert math.isnan(store.column('value')[0])
+    with pytest.raises(ValueError):
+        store.append({'value': 1.0})        # int64 and category columns are required
+    with pytest.raises(KeyError):
+        store.append({'unknown': 1.0})
+
+
+def test_truncate(tmp_path):
+    store = filled(tmp_path / 'store')
+    store.append({'battery_type': 'LIB_LFP', 'index': 99, 'value': 99.0})     # buffered, dropped too
+    store.truncate(4)
+    assert len(store) == 4
+    store.append({'battery_type': 'LIB_LFP', 'index': 4, 'value': 7.0})
+    store.close()
+    store = ResultStore(str(tmp_path / 'store'))
+    np.testing.assert_array_equal(store.column('index'), np.arange(5))
+    assert store.column('value')[-1] == 7.0
+    with pytest.raises(ValueError):
+        store.truncate(6)
+
+
+def test_select_and_aggregate(tmp_path):
+    store = filled(tmp_path / 'store')
+    selected = store.select(['index', 'battery_type'], where=[('battery_type', '==', 'LIB_LFP'), ('value', '<', 3)],
+                            block_size=3)
+    np.testing.assert_array_equal(selected['index'], [1, 3, 5])
+    assert list(selected['battery_type']) == ['LIB_LFP'] * 3
+    assert store.select(where=[('battery_type', '==', 'NIB')])['index'].size == 0
+    assert store.select(['index'], where=[('index', 'in', [2, 7])])['index'].tolist() == [2, 7]
+
+    values = np.arange(10) * 0.5
+    summary = store.aggregate('value', block_size=3)
+    assert summary['count'] == 10
+    assert summary['sum'] == pytest.approx(values.sum())
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['std'] == pytest.approx(values.std(ddof=1))
+    assert (summary['min'], summary['max']) == (0.0, 4.5)
+    assert store.aggregate('value', 'mean', group_by='battery_type') == {
+        'ASSB_LFP': pytest.approx(values[::2].mean()), 'LIB_LFP': pytest.approx(values[1::2].mean())}
+    with pytest.raises(ValueError):
+        store.aggregate('value', 'median')
+
+
+def test_result_row(models, tmp_path):
+    model = models['baseline']
+    store = ResultStore(str(tmp_path / 'store'), dict({'battery_type': 'category'}, **dict.fromkeys(RESULT_COLUMNS, 'float64')))
+    store.append(result_row(model, 'ASSB_NMC811'))
+    store.close()
+    assert store.column('Specific_energy')[0] == model.calculate_pouch_cell('ASSB_NMC811')['Specific_energy']
+
+
+def sweep(scenario_paths):
+    return SweepRunner([scenario_paths['baseline'], scenario_paths['optimal']],
+                       overrides={'porosity_cathode': [0.2, 0.25, 0.3], 'mass_loading_cathode': [10.0, 15.0, 20.0]},
+                       chunk_size=10, max_workers=1)
+
+
+def test_sweep_into_store(scenario_paths, tmp_path):
+    expected = sweep(scenario_paths).run()
+    store = sweep(scenario_paths).run(store=str(tmp_path / 'store'))
+    assert len(store) == len(expected['Specific_energy'])
+    np.testing.assert_array_equal(store.column('Specific_energy'), expected['Specific_energy'])
+    np.testing.assert_array_equal(store.column('porosity_cathode'), expected['porosity_cathode'])
+
+
+def test_resume_sweep_into_store(scenario_paths, tmp_path):
+    expected = sweep(scenario_paths).run()
+    runner = sweep(scenario_paths)
+    chunks = runner.iter_chunks
+
+    def interrupted(first_chunk=0):
+        for i, chunk in enumerate(chunks(first_chunk)):
+            if i == 3:
+                raise KeyboardInterrupt
+            yield chunk
+    runner.iter_chunks = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(store=str(tmp_path / 'store'))
+    store = ResultStore(str(tmp_path / 'store'))
+    assert len(store) == 30
+    store.append({'scenario': 0, 'battery_type': 'LIB_LFP'})     # a partly written chunk
+    store.flush()
+
+    resumed = sweep(scenario_paths)
+    evaluated = []
+    chunks_resumed = resumed.iter_chunks
+
+    def counted(first_chunk=0):
+        for chunk, results in chunks_resumed(first_chunk):
+            evaluated.append(chunk)
+            yield chunk, results
+    resumed.iter_chunks = counted
+    store = resumed.run(store=str(tmp_path / 'store'))
+    assert evaluated == list(range(3, resumed.n_chunks))
+    assert len(store) == len(expected['Specific_energy'])
+    for key in ('scenario', 'porosity_cathode', 'Specific_energy', 'one_cell_man_energy'):
+        np.testing.assert_array_equal(store.column(key), expected[key])
+
+    other = SweepRunner([scenario_paths['baseline'], scenario_paths['optimal']],
+                        overrides={'porosity_cathode': [0.2], 'mass_loading_cathode': [10.0, 15.0, 20.0]},
+                        chunk_size=10, max_workers=1)
+    with pytest.raises(ValueError, match='different sweep'):
+        other.run(store=str(tmp_path / 'store'))
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+import yaml
+
+import ASSB_scenarios
+from ASSB_scenarios import clear_cache, load_compiled, load_scenario, scenario_hash
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    # an empty memory cache and a disk cache in tmp_path
+    monkeypatch.setattr(ASSB_scenarios, 'CACHE_DIR', str(tmp_path / 'cache'))
+    clear_cache()
+    yield tmp_path / 'cache'
+    clear_cache()
+
+
+def write(path, tree):
+    with open(path, 'w') as file:
+        yaml.safe_dump(tree, file)
+    return str(path)
+
+
+def test_overlay(scenario_paths, tmp_path):
+    baseline = load_scenario(scenario_paths['baseline'])
+    overlay = write(tmp_path / 'overlay.yml', {
+        'parent': scenario_paths['baseline'],
+        'thicknesses': {'electrolyte': {'ASSB_LFP': 0.05}},
+        'notes': {'source': 'test'},
+    })
+    child = write(tmp_path / 'child.yml', {'parent': 'overlay.yml', 'thicknesses': {'aluminum_foil': 0.011}})
+    para = load_scenario(child)
+    assert para['thicknesses']['electrolyte'] == dict(baseline['thicknesses']['electrolyte'], ASSB_LFP=0.05)
+    assert para['thicknesses']['aluminum_foil'] == 0.011
+    assert para['notes'] == {'source': 'test'}
+    assert para['densities'] == baseline['densities']
+    assert 'parent' not in para
+    assert load_compiled(overlay)[2]['ASSB_LFP'].electrolyte_thickness == 0.05
+
+
+def test_shipped_overlays_are_complete(scenario_paths):
+    # every parameter of every battery type resolves in the overlay scenarios
+    for name in ('optimal', 'highest'):
+        para, common, records = load_compiled(scenario_paths[name])
+        assert sorted(records) == sorted(load_scenario(scenario_paths['baseline'])['battery_type'])
+
+
+def test_invalid_overlay(scenario_paths, tmp_path):
+    overlay = write(tmp_path / 'overlay.yml', {'parent': scenario_paths['baseline'], 'material_properties': {'porosity_cathode': 1.5}})
+    with pytest.raises(ValueError, match='porosity_cathode'):
+        load_scenario(overlay)
+
+
+def test_parent_cycle(tmp_path):
+    write(tmp_path / 'a.yml', {'parent': 'b.yml'})
+    write(tmp_path / 'b.yml', {'parent': 'a.yml'})
+    with pytest.raises(ValueError, match='cycle'):
+        load_scenario(str(tmp_path / 'a.yml'))
+
+
+def test_not_a_mapping(tmp_path):
+    path = tmp_path / 'list.yml'
+    path.write_text('- 1\n- 2\n')
+    with pytest.raises(ValueError):
+        load_scenario(str(path))
+
+
+def test_fresh_copies(scenario_paths):
+    para, common, records = load_compiled(scenario_paths['baseline'])
+    para['dimensions']['cathode']['width'] = 1
+    records['ASSB_LFP'].cathode_width = 1
+    para, common, records = load_compiled(scenario_paths['baseline'])
+    assert para['dimensions']['cathode']['width'] != 1
+    assert records['ASSB_LFP'].cathode_width != 1
+
+
+def test_disk_cache(scenario_paths, tmp_path, disk_cache):
+    overlay = write(tmp_path / 'overlay.yml', {
+        'parent': scenario_paths['baseline'],
+        'thicknesses': {'electrolyte': {'ASSB_LFP': 0.05}},
+        'notes': {2025: 'a', 'b': [1, {2030: 'c'}]},       # keys JSON cannot keep
+    })
+    cold = load_scenario(overlay)
+    assert len(os.listdir(disk_cache)) == 1      # the baseline, not the overlay
+    clear_cache()
+    warm = load_scenario(overlay)                # the baseline from the disk cache
+    assert warm == cold
+    assert warm['notes'] == {2025: 'a', 'b': [1, {2030: 'c'}]}
+
+
+def test_disk_cache_is_used(scenario_paths, disk_cache, monkeypatch):
+    cold = load_scenario(scenario_paths['highest'])
+    assert len(os.listdir(disk_cache)) == 3      # highest, optimal and baseline
+    clear_cache()
+    monkeypatch.setattr(ASSB_scenarios.yaml, 'safe_load', None)    # parsing would fail
+    assert load_scenario(scenario_paths['highest']) == cold
+
+
+def test_cache_size(scenario_paths, disk_cache, monkeypatch):
+    monkeypatch.setattr(ASSB_scenarios, 'CACHE_SIZE', 2)
+    load_scenario(scenario_paths['highest'])
+    assert len(os.listdir(disk_cache)) == 2
+    assert len(ASSB_scenarios._parsed) == 2
+
+
+def test_edited_parent(scenario_paths, tmp_path):
+    parent = write(tmp_path / 'parent.yml', load_scenario(scenario_paths['baseline']))
+    child = write(tmp_path / 'child.yml', {'parent': 'parent.yml', 'thicknesses': {'aluminum_foil': 0.011}})
+    digest = scenario_hash(child)
+    tree = load_scenario(parent)
+    tree['thicknesses']['copper_foil'] = 0.009
+    write(parent, tree)
+    assert scenario_hash(child) != digest
+    assert load_scenario(child)['thicknesses']['copper_foil'] == 0.009
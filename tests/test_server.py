@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+from ASSB_batch_model import MANUFACTURING_KEYS, POUCH_CELL_KEYS
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import parameter_update
+from ASSB_server import EvaluationServer, MicroBatcher, RequestError
+
+
+@pytest.fixture(scope='module')
+def server(scenario_paths):
+    return EvaluationServer(scenario_paths, window=0.001)
+
+
+def exchange(server, path, *messages):
+    # serve on the Unix socket path and send each raw HTTP message on its own connection
+    # returns [(status, decoded body)]
+    async def run():
+        ready = asyncio.Event()
+        serving = asyncio.ensure_future(server.serve(unix_path=path, ready=ready))
+        await ready.wait()
+        responses = []
+        try:
+            for message in messages:
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(message)
+                await writer.drain()
+                data = await asyncio.wait_for(reader.read(), 30)
+                writer.close()
+                head, _, body = data.partition(b'\r\n\r\n')
+                responses.append((int(head.split()[1]), json.loads(body)))
+        finally:
+            serving.cancel()
+        return responses
+    return asyncio.run(run())
+
+
+def post(payload, body=None):
+    body = json.dumps(payload).encode() if body is None else body
+    return b'POST /evaluate HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n' % len(body) + body
+
+
+def test_outputs_default_to_all(server):
+    batcher = MicroBatcher(server.models)
+    for outputs in (None, []):
+        request = {'scenario': 'baseline', 'battery_type': 'ASSB_LFP'}
+        if outputs is not None:
+            request['outputs'] = outputs
+        scenario, battery_type, parameters, keys = batcher.check(request)
+        assert keys == list(POUCH_CELL_KEYS['ASSB'] + MANUFACTURING_KEYS)
+
+
+@pytest.mark.parametrize('request_', [
+    [], {'scenario': ['x'], 'battery_type': 'ASSB_LFP'}, {'battery_type': ['x']}, {'battery_type': 'NIB'},
+    {'battery_type': 'ASSB_LFP', 'outputs': 'Specific_energy'}, {'battery_type': 'ASSB_LFP', 'outputs': [['a']]},
+    {'battery_type': 'ASSB_LFP', 'parameters': {'separator_thickness': 0.02}},
+    {'battery_type': 'ASSB_LFP', 'parameters': {'porosity_cathode': 'x'}},
+    {'battery_type': 'ASSB_LFP', 'parameters': {'ratio_cathode_bc': 'x'}},
+    {'battery_type': 'ASSB_LFP', 'parameters': {'porosity_cathode': 1.5}},
+])
+def test_invalid_requests(server, request_):
+    with pytest.raises(RequestError):
+        MicroBatcher(server.models).check(request_)
+
+
+def test_http(server, models, tmp_path):
+    model = models['optimal']
+    expected = model.calculate_pouch_cell('ASSB_NMC811')['Specific_energy']
+    responses = exchange(
+        server, str(tmp_path / 'assb.sock'),
+        post({'scenario': 'optimal', 'battery_type': 'ASSB_NMC811'}),      # no outputs
+        post({'scenario': 'optimal', 'battery_type': 'ASSB_NMC811', 'outputs': ['Specific_energy']}),
+        post({'battery_type': 'ASSB_NMC811', 'parameters': {'porosity_cathode': -1}}),
+        post(None, body=b'{"battery_type": '),
+        b'POST /evaluate HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+        b'GET /evaluate HTTP/1.1\r\nConnection: close\r\n\r\n',
+        b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n',
+    )
+    (status, body), (status_one, body_one) = responses[:2]
+    assert status == 200 and body['results']['Specific_energy'] == pytest.approx(expected, rel=1e-12)
+    assert set(body['results']) == set(POUCH_CELL_KEYS['ASSB'] + MANUFACTURING_KEYS)
+    assert status_one == 200 and list(body_one['results']) == ['Specific_energy']
+    assert [status for status, body in responses[2:]] == [400, 400, 400, 405, 200]
+    assert 'porosity_cathode' in responses[2][1]['error']
+
+
+def test_batch_results_equal_scalar(server, scenario_paths):
+    # concurrent requests with different parameters are evaluated in one batch
+    batcher = MicroBatcher(server.models, window=0.05)
+    requests = [{'scenario': 'baseline', 'battery_type': bt, 'parameters': {'mass_loading_cathode': loading},
+                 'outputs': ['Specific_energy', 'one_cell_man_energy']}
+                for bt in ('LIB_LFP', 'ASSB_NMC811') for loading in (10.0, 20.0)]
+
+    async def run():
+        batching = asyncio.ensure_future(batcher.run())
+        try:
+            return await asyncio.gather(*(batcher.submit(request) for request in requests))
+        finally:
+            batching.cancel()
+    results = asyncio.run(run())
+    assert batcher.batches == 1
+    for request, result in zip(requests, results):
+        model = BatteryModel(scenario_paths['baseline'])
+        model.update_parameters(parameter_update(request['parameters'], request['battery_type']))
+        assert result['Specific_energy'] == pytest.approx(
+            model.calculate_pouch_cell(request['battery_type'])['Specific_energy'], rel=1e-12)
+        assert result['one_cell_man_energy'] == pytest.approx(
+            model.manufacturing_energy(request['battery_type'])['one_cell_man_energy'], rel=1e-12)
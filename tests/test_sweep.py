@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from ASSB_dimensioning_model import BatteryModel
+from ASSB_parameters import parameter_update
+from ASSB_sweep import BATTERY_TYPES, SweepRunner
+
+OVERRIDES = {'mass_loading_cathode': [10.0, 20.0], 'porosity_cathode': [0.2, 0.3], 'separator_thickness': [0.015]}
+
+
+@pytest.fixture
+def paths(scenario_paths):
+    return [scenario_paths['baseline'], scenario_paths['highest']]
+
+
+def test_rows_in_input_order(paths):
+    runner = SweepRunner(paths, BATTERY_TYPES, OVERRIDES, chunk_size=5, max_workers=2)
+    assert len(runner) == 2 * 4 * 2 * 2
+    results = runner.run()
+    row = 0
+    for s, path in enumerate(paths):
+        for b, bt in enumerate(BATTERY_TYPES):
+            for loading in OVERRIDES['mass_loading_cathode']:
+                for porosity in OVERRIDES['porosity_cathode']:
+                    assert (results['scenario'][row], results['battery_type'][row]) == (s, b)
+                    assert (results['mass_loading_cathode'][row], results['porosity_cathode'][row]) == (loading, porosity)
+                    model = BatteryModel(path)
+                    values = {'mass_loading_cathode': loading, 'porosity_cathode': porosity}
+                    if bt.startswith('LIB'):
+                        values['separator_thickness'] = 0.015
+                    model.update_parameters(parameter_update(values, bt))
+                    expected = model.calculate_pouch_cell(bt)['Specific_energy']
+                    assert results['Specific_energy'][row] == pytest.approx(expected, rel=1e-12)
+                    row += 1
+
+
+def test_checkpoint(paths, tmp_path):
+    directory = str(tmp_path / 'checkpoint')
+    expected = SweepRunner(paths, overrides=OVERRIDES, chunk_size=6, max_workers=1).run()
+    runner = SweepRunner(paths, overrides=OVERRIDES, chunk_size=6, max_workers=1, checkpoint_dir=directory)
+    for chunk, results in runner.iter_chunks():
+        if chunk == 2:
+            break       # interrupted
+    assert sorted(os.listdir(directory)) == ['chunk_000000.npz', 'chunk_000001.npz', 'chunk_000002.npz', 'sweep.json']
+    os.remove(os.path.join(directory, 'chunk_000001.npz'))
+    resumed = SweepRunner(paths, overrides=OVERRIDES, chunk_size=6, max_workers=1, checkpoint_dir=directory).run()
+    for key, values in expected.items():
+        np.testing.assert_array_equal(resumed[key], values)
+    with pytest.raises(ValueError, match='different sweep'):
+        SweepRunner(paths, overrides={'porosity_cathode': [0.2]}, chunk_size=6, checkpoint_dir=directory).run()
+
+
+@pytest.mark.parametrize('overrides', [
+    {'porosity_cathode': [0.2, 1.5]},
+    {'mass_loading_cathode': [-1.0]},
+    {'electrolyte_thickness': ['thin']},
+    {'ratio_cathode_active_material': [0.99]},     # the cathode ratios add up to more than 1
+])
+def test_invalid_override_values(paths, overrides):
+    with pytest.raises(ValueError):
+        SweepRunner(paths, overrides=overrides)
+
+
+def test_unknown_overrides(paths):
+    with pytest.raises(KeyError):
+        SweepRunner(paths, overrides={'unknown': [1.0]})
+    with pytest.raises(KeyError):
+        SweepRunner(paths, ['ASSB_LFP', 'ASSB_NMC811'], {'separator_thickness': [0.015]})
+    with pytest.raises(KeyError):
+        SweepRunner(paths, ['NIB'])